@@ -0,0 +1,181 @@
+"""Benchmark serial board polling against FleetClient fan-out, using local stand-in boards.
+
+Each stand-in server speaks the board protocol (POST {"command", "args"} -> JSON response),
+handles one request at a time like the board's webserver, and sleeps for a fixed latency
+per command to stand in for Wi-Fi and command execution time.
+
+    cd host && python benchmarks/fleet_benchmark.py --boards 24 --rounds 5 --latency 0.02
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pico_fleet import FleetClient  # noqa: E402
+
+
+class StandInBoard:
+    """A local server answering board commands after a fixed latency, one request at a time."""
+
+    def __init__(self, latency, keep_alive):
+        self.latency = latency
+        self.keep_alive = keep_alive  # The real board closes after each response
+        self.lock = asyncio.Lock()
+        self.handled = 0
+        self.port = None
+        self.server = None
+        self.connections = set()  # Writers of open connections, closed on shutdown
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def _serve(self, reader, writer):
+        self.connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                content_length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    if line.lower().startswith(b"content-length:"):
+                        content_length = int(line.split(b":")[1])
+                command_data = json.loads(await reader.readexactly(content_length))
+
+                async with self.lock:
+                    await asyncio.sleep(self.latency)
+                    self.handled += 1
+                body = json.dumps({"status": "success", "response": f"Executed {command_data['command']}"}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\n".encode()
+                    + (b"Connection: keep-alive\r\n" if self.keep_alive else b"Connection: close\r\n")
+                    + b"\r\n" + body
+                )
+                await writer.drain()
+                if not self.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+
+def start_boards(count, latency, keep_alive):
+    """Run the stand-in boards on an event loop in a background thread. Returns (boards, loop)."""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    boards = []
+
+    async def main():
+        for _ in range(count):
+            board = StandInBoard(latency, keep_alive)
+            await board.start()
+            boards.append(board)
+        ready.set()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(main())
+        loop.run_forever()
+        loop.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return boards, loop
+
+
+def stop_boards(boards, loop):
+    """Close the stand-in servers and their open connections, wait for the handlers to finish, then stop the loop."""
+
+    async def shutdown():
+        for board in boards:
+            board.server.close()
+            # Handlers of kept-alive connections are waiting for the next request and end at EOF
+            for writer in list(board.connections):
+                writer.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=1.0)
+            for task in pending:
+                task.cancel()
+        for board in boards:
+            await board.server.wait_closed()
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def post_serially(ports, rounds):
+    """The usual controller loop: one blocking request per board, one board after another."""
+    for _ in range(rounds):
+        for port in ports:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("POST", "/", json.dumps({"command": "list_hardware", "args": []}),
+                         {"Content-Type": "application/json"})
+            json.loads(conn.getresponse().read())
+            conn.close()
+
+
+async def post_with_fleet(ports, rounds, max_connections):
+    boards = {f"board{i}": f"127.0.0.1:{port}" for i, port in enumerate(ports)}
+    async with FleetClient(boards, max_connections=max_connections) as fleet:
+        results = []
+        for _ in range(rounds):
+            results.extend((await fleet.run("list_hardware")).values())
+        # Batched submission: every round queued at once, pooled per board
+        batch = [(name, "list_hardware", []) for name in boards for _ in range(rounds)]
+        started = time.perf_counter()
+        batch_results = await fleet.submit(batch)
+        batch_elapsed = time.perf_counter() - started
+    return results, batch_results, batch_elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boards", type=int, default=24)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per command on a stand-in board")
+    parser.add_argument("--max-connections", type=int, default=2)
+    parser.add_argument("--keep-alive", action="store_true", help="stand-in boards keep connections open")
+    options = parser.parse_args()
+
+    boards, loop = start_boards(options.boards, options.latency, options.keep_alive)
+    ports = [board.port for board in boards]
+    requests = options.boards * options.rounds
+
+    started = time.perf_counter()
+    post_serially(ports, options.rounds)
+    serial_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results, batch_results, batch_elapsed = asyncio.run(
+        post_with_fleet(ports, options.rounds, options.max_connections))
+    fleet_elapsed = time.perf_counter() - started - batch_elapsed
+
+    stop_boards(boards, loop)
+
+    print(f"{options.boards} boards x {options.rounds} rounds, {options.latency * 1000:.0f} ms per command, "
+          f"keep-alive {'on' if options.keep_alive else 'off'}")
+    print(f"serial:            {serial_elapsed:7.3f} s  ({requests / serial_elapsed:8.1f} commands/s)")
+    print(f"fleet run():       {fleet_elapsed:7.3f} s  ({requests / fleet_elapsed:8.1f} commands/s)")
+    print(f"fleet submit():    {batch_elapsed:7.3f} s  ({requests / batch_elapsed:8.1f} commands/s)")
+    print("run() summary:    ", FleetClient.summarize(results))
+    print("submit() summary: ", FleetClient.summarize(batch_results))
+
+
+if __name__ == "__main__":
+    main()
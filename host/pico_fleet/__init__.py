@@ -0,0 +1,6 @@
+"""Host-side asyncio client for driving one or many boards over their webserver."""
+
+from pico_fleet.client import BoardClient, BoardError, CommandResult
+from pico_fleet.fleet import FleetClient
+
+__all__ = ["BoardClient", "BoardError", "CommandResult", "FleetClient"]
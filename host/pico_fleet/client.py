@@ -0,0 +1,222 @@
+import asyncio
+import json
+import time
+
+
+class BoardError(Exception):
+    """Raised when a board cannot be reached or answers with an HTTP error."""
+
+    def __init__(self, message, status=None, retry_after=None, may_have_run=True):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.may_have_run = may_have_run  # False when the board certainly did not run the command
+
+
+class CommandResult:
+    """Outcome of one command sent to one board."""
+
+    def __init__(self, board, command, args, ok, response=None, error=None, status=None, attempts=1, elapsed=0.0):
+        self.board = board
+        self.command = command
+        self.args = args
+        self.ok = ok
+        self.response = response  # The board's "response" value when ok
+        self.error = error        # Error message when not ok
+        self.status = status      # HTTP status code, None if no response was received
+        self.attempts = attempts
+        self.elapsed = elapsed    # Seconds, including retries
+
+    def __repr__(self):
+        outcome = repr(self.response) if self.ok else f"error={self.error!r}"
+        return f"CommandResult({self.board}, {self.command}, {outcome}, attempts={self.attempts})"
+
+
+# HTTP statuses the board's webserver uses to ask clients to come back later
+RETRYABLE_STATUSES = {429, 503}
+
+
+class BoardClient:
+    """Client for one board's webserver, keeping a pool of persistent connections.
+
+    The board speaks JSON over HTTP: POST {"command": ..., "args": [...]} and receive
+    {"status": "success", "response": ...} or {"status": "error", "message": ...}.
+    Connections are reused while the server keeps them open; the board currently
+    closes each connection after one response, in which case a new one is opened.
+
+    Failures where the board certainly did not run the command (the connection could not
+    be opened, or a 429/503 reply) are always retried. After a timeout or a connection
+    lost once the request was sent the command may have run, so it is only retried for
+    idempotent commands: those in idempotent_commands, or sent with idempotent=True.
+    """
+
+    def __init__(self, host, port=8080, name=None, timeout=5.0, retries=2, backoff=0.1, max_connections=2,
+                 idempotent_commands=()):
+        self.host = host
+        self.port = port
+        self.name = name or f"{host}:{port}"
+        self.timeout = timeout                  # Seconds per attempt
+        self.retries = retries                  # Extra attempts on retryable failures
+        self.backoff = backoff                  # Seconds before the first retry, doubled after each one
+        self.max_connections = max_connections  # Concurrent requests in flight to this board
+        self.idempotent_commands = set(idempotent_commands)  # Commands also retried after a timeout
+        self._idle = []                         # Idle (reader, writer) pairs, most recently used last
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close all idle pooled connections."""
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _open(self):
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def _connect(self):
+        """Open a new connection, raising a BoardError marked as not run if that fails."""
+        try:
+            return await self._open()
+        except OSError as e:
+            raise BoardError(f"Connection failed: {e}", may_have_run=False)
+
+    async def _exchange(self, reader, writer, payload, sent):
+        """Send one request on a connection and read the response. Returns (status, headers, body).
+
+        sent is marked once the request may have reached the board. Malformed responses raise BoardError.
+        """
+        sent.append(True)
+        writer.write(
+            (
+                "POST / HTTP/1.1\r\n"
+                f"Host: {self.host}:{self.port}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Connection: keep-alive\r\n"
+                "\r\n"
+            ).encode("utf-8")
+            + payload
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed before a response was received.")
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise BoardError(f"Malformed status line: {status_line[:80]!r}")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        if "content-length" in headers:
+            try:
+                content_length = int(headers["content-length"])
+            except ValueError:
+                raise BoardError(f"Malformed Content-Length: {headers['content-length'][:80]!r}", status)
+            body = await reader.readexactly(content_length)
+        else:
+            body = await reader.read()
+        return status, headers, body
+
+    async def _request(self, payload, sent):
+        """Send a request over a pooled connection, opening a new one if needed. The caller holds a slot."""
+        reused = bool(self._idle)
+        reader, writer = self._idle.pop() if reused else await self._connect()
+        try:
+            status, headers, body = await self._exchange(reader, writer, payload, sent)
+        except (ConnectionError, asyncio.IncompleteReadError, OSError):
+            writer.close()
+            if not reused:
+                raise
+            # The server closed the idle connection, which is not a failure of this request
+            sent.clear()
+            reader, writer = await self._connect()
+            try:
+                status, headers, body = await self._exchange(reader, writer, payload, sent)
+            except BaseException:
+                writer.close()
+                raise
+        except BaseException:
+            writer.close()
+            raise
+
+        if headers.get("connection", "").lower() == "close" or reader.at_eof():
+            writer.close()
+        else:
+            self._idle.append((reader, writer))
+        return status, headers, body
+
+    async def _attempt(self, payload):
+        """Run one attempt, returning the decoded response or raising BoardError."""
+        # Waiting for a free connection slot is not part of the timeout: the command has not been sent yet
+        async with self._slots:
+            sent = []  # Marked by _exchange once the request may have reached the board
+            try:
+                status, headers, body = await asyncio.wait_for(self._request(payload, sent), self.timeout)
+            except asyncio.TimeoutError:
+                raise BoardError(f"Timed out after {self.timeout}s.", may_have_run=bool(sent))
+            except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+                raise BoardError(f"Connection failed: {e}", may_have_run=bool(sent))
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            data = {"status": "error", "message": f"Unexpected response: {body[:80].decode('utf-8', 'replace')}"}
+        if status in RETRYABLE_STATUSES:
+            raise BoardError(data.get("message", f"HTTP {status}"), status, self._parse_retry_after(headers.get("retry-after")),
+                             may_have_run=False)
+        return status, data
+
+    @staticmethod
+    def _parse_retry_after(value):
+        """Return a Retry-After header in seconds, or None if it is missing or not a number (e.g. an HTTP date)."""
+        try:
+            return max(0.0, float(value)) if value else None
+        except ValueError:
+            return None
+
+    async def send(self, command, *args, idempotent=None):
+        """Send a command to the board, retrying transient failures. Returns a CommandResult.
+
+        idempotent overrides whether the command is in idempotent_commands, i.e. whether it
+        is retried after failures where it may already have run.
+        """
+        if idempotent is None:
+            idempotent = command in self.idempotent_commands
+        payload = json.dumps({"command": command, "args": list(args)}).encode("utf-8")
+        started = time.monotonic()
+        delay = self.backoff
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                status, data = await self._attempt(payload)
+            except BoardError as e:
+                if attempt > self.retries or (e.may_have_run and not idempotent):
+                    return CommandResult(self.name, command, args, False, error=str(e), status=e.status,
+                                         attempts=attempt, elapsed=time.monotonic() - started)
+                await asyncio.sleep(max(delay, e.retry_after or 0))
+                delay *= 2
+                continue
+
+            ok = data.get("status") == "success"
+            return CommandResult(self.name, command, args, ok, response=data.get("response"),
+                                 error=None if ok else data.get("message"), status=status,
+                                 attempts=attempt, elapsed=time.monotonic() - started)
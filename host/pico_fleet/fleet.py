@@ -0,0 +1,71 @@
+import asyncio
+
+from pico_fleet.client import BoardClient
+
+
+class FleetClient:
+    """Client for many boards, fanning commands out concurrently over per-board connection pools.
+
+    boards maps a board name to a BoardClient, a "host:port" string or a dict of
+    BoardClient keyword arguments (host, port, timeout, retries, ...), so timeouts
+    and retries can be set per board.
+    """
+
+    def __init__(self, boards, **defaults):
+        self.boards = {}
+        for name, board in boards.items():
+            if isinstance(board, BoardClient):
+                self.boards[name] = board
+            elif isinstance(board, str):
+                host, _, port = board.rpartition(":")
+                self.boards[name] = BoardClient(host, int(port), name=name, **defaults)
+            else:
+                self.boards[name] = BoardClient(name=name, **{**defaults, **board})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close the connection pools of all boards."""
+        await asyncio.gather(*(board.close() for board in self.boards.values()))
+
+    async def run(self, command, *args, boards=None, idempotent=None):
+        """Send the same command to every board (or the named boards). Returns {board name: CommandResult}."""
+        names = list(self.boards) if boards is None else list(boards)
+        results = await asyncio.gather(*(self.boards[name].send(command, *args, idempotent=idempotent) for name in names))
+        return dict(zip(names, results))
+
+    async def submit(self, batch):
+        """Send a batch of (board name, command, args) entries concurrently.
+
+        Entries for the same board share its pool, so at most max_connections of them are
+        in flight per board. Returns the CommandResults in batch order.
+        """
+        return list(await asyncio.gather(*(self.boards[name].send(command, *args) for name, command, args in batch)))
+
+    @staticmethod
+    def summarize(results):
+        """Aggregate CommandResults (a list or a {board: result} dict) into counts, failures and latencies."""
+        if isinstance(results, dict):
+            results = list(results.values())
+        latencies = sorted(result.elapsed for result in results)
+        summary = {
+            "total": len(results),
+            "ok": sum(1 for result in results if result.ok),
+            "failed": {},
+            "retried": sum(1 for result in results if result.attempts > 1),
+        }
+        for result in results:
+            if not result.ok:
+                summary["failed"].setdefault(result.board, []).append(f"{result.command}: {result.error}")
+        if latencies:
+            summary["latency_s"] = {
+                "min": latencies[0],
+                "median": latencies[len(latencies) // 2],
+                "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "max": latencies[-1],
+            }
+        return summary
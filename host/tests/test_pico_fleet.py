@@ -0,0 +1,213 @@
+"""Tests for the pico_fleet host client against local stand-in board servers.
+
+    cd host && python -m pytest tests
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pico_fleet import BoardClient, CommandResult, FleetClient  # noqa: E402
+
+
+class ScriptedBoard:
+    """A local server answering each request with the next scripted (status, headers, delay), then 200 OK.
+
+    A scripted status given as bytes is sent as the raw response instead.
+    """
+
+    def __init__(self, script=(), keep_alive=False, close_after_response=0.0, latency=0.0):
+        self.script = list(script)
+        self.latency = latency  # Seconds per unscripted request
+        self.keep_alive = keep_alive
+        self.close_after_response = close_after_response  # Seconds before dropping a kept-alive connection
+        self.connections = 0
+        self.commands = []
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                if not await reader.readline():
+                    break
+                content_length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    if line.lower().startswith(b"content-length:"):
+                        content_length = int(line.split(b":")[1])
+                command = json.loads(await reader.readexactly(content_length))["command"]
+                self.commands.append(command)
+
+                status, headers, delay = self.script.pop(0) if self.script else (200, {}, self.latency)
+                await asyncio.sleep(delay)
+                if isinstance(status, bytes):
+                    writer.write(status)
+                    await writer.drain()
+                    break
+                if status == 200:
+                    body = {"status": "success", "response": f"Executed {command}"}
+                else:
+                    body = {"status": "error", "message": "retry later"}
+                body = json.dumps(body).encode()
+                headers = {**headers, "Connection": "keep-alive" if self.keep_alive else "close"}
+                writer.write(
+                    f"HTTP/1.1 {status} X\r\nContent-Length: {len(body)}\r\n".encode()
+                    + "".join(f"{key}: {value}\r\n" for key, value in headers.items()).encode()
+                    + b"\r\n" + body
+                )
+                await writer.drain()
+                if not self.keep_alive:
+                    break
+                if self.close_after_response:
+                    # Drop the connection while the client still holds it as idle
+                    await asyncio.sleep(self.close_after_response)
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+class BoardClientTest(unittest.IsolatedAsyncioTestCase):
+
+    async def start_board(self, **kwargs):
+        board = ScriptedBoard(**kwargs)
+        await board.start()
+        self.addAsyncCleanup(board.stop)
+        return board
+
+    async def test_retries_503_after_retry_after(self):
+        board = await self.start_board(script=[(503, {"Retry-After": "0.2"}, 0)])
+        async with BoardClient("127.0.0.1", board.port, backoff=0.01) as client:
+            started = time.monotonic()
+            result = await client.send("list_hardware")
+        self.assertTrue(result.ok)
+        self.assertEqual(result.attempts, 2)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(board.commands, ["list_hardware", "list_hardware"])
+
+    async def test_gives_up_after_retries(self):
+        board = await self.start_board(script=[(429, {"Retry-After": "0"}, 0)] * 3)
+        async with BoardClient("127.0.0.1", board.port, retries=1, backoff=0.01) as client:
+            result = await client.send("list_hardware")
+        self.assertFalse(result.ok)
+        self.assertEqual(result.status, 429)
+        self.assertEqual(result.attempts, 2)
+
+    async def test_timeout_not_retried_unless_idempotent(self):
+        board = await self.start_board(script=[(200, {}, 0.5), (200, {}, 0.5)])
+        async with BoardClient("127.0.0.1", board.port, timeout=0.1, backoff=0.01) as client:
+            result = await client.send("start", "gpio_15")
+            self.assertFalse(result.ok)
+            self.assertEqual(result.attempts, 1)
+
+            result = await client.send("list_hardware", idempotent=True)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.attempts, 2)
+
+    async def test_idempotent_commands_retried_after_timeout(self):
+        board = await self.start_board(script=[(200, {}, 0.5)])
+        async with BoardClient("127.0.0.1", board.port, timeout=0.1, backoff=0.01,
+                               idempotent_commands={"list_hardware"}) as client:
+            result = await client.send("list_hardware")
+        self.assertTrue(result.ok)
+        self.assertEqual(result.attempts, 2)
+
+    async def test_connection_refused_retried(self):
+        board = await self.start_board()
+        port = board.port
+        await board.stop()
+        async with BoardClient("127.0.0.1", port, retries=2, backoff=0.01) as client:
+            result = await client.send("start", "gpio_15")
+        self.assertFalse(result.ok)
+        self.assertEqual(result.attempts, 3)
+
+    async def test_retry_after_http_date_falls_back_to_backoff(self):
+        board = await self.start_board(script=[(503, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}, 0)])
+        async with BoardClient("127.0.0.1", board.port, backoff=0.01) as client:
+            result = await client.send("start", "gpio_15")
+        self.assertTrue(result.ok)
+        self.assertEqual(result.attempts, 2)
+
+    async def test_waiting_for_a_connection_slot_is_not_timed(self):
+        board = await self.start_board(latency=0.1)
+        async with BoardClient("127.0.0.1", board.port, timeout=0.3, max_connections=1) as client:
+            results = await asyncio.gather(*(client.send("start", f"gpio_{pin}") for pin in range(6)))
+        self.assertEqual([result.ok for result in results], [True] * 6)
+        self.assertEqual([result.attempts for result in results], [1] * 6)
+        self.assertEqual(len(board.commands), 6)
+
+    async def test_malformed_responses_become_results(self):
+        board = await self.start_board(script=[
+            (b"garbage\r\n", {}, 0),
+            (b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n[]", {}, 0),
+            (b"HTTP/1.1 200 OK\r\nContent-Length: many\r\n\r\n{}", {}, 0),
+        ])
+        async with BoardClient("127.0.0.1", board.port, backoff=0.01) as client:
+            results = [await client.send("start", "gpio_15") for _ in range(3)]
+        self.assertEqual([result.ok for result in results], [False] * 3)
+        self.assertEqual([result.attempts for result in results], [1] * 3)  # They reached the board
+        self.assertIn("Malformed status line", results[0].error)
+        self.assertIn("Unexpected response", results[1].error)
+        self.assertIn("Malformed Content-Length", results[2].error)
+
+    async def test_one_bad_board_does_not_fail_the_fleet(self):
+        good = await self.start_board()
+        bad = await self.start_board(script=[(b"garbage\r\n", {}, 0)])
+        async with FleetClient({"good": f"127.0.0.1:{good.port}", "bad": f"127.0.0.1:{bad.port}"}) as fleet:
+            results = await fleet.run("list_hardware")
+        self.assertTrue(results["good"].ok)
+        self.assertFalse(results["bad"].ok)
+
+    async def test_reconnects_when_reused_connection_was_closed(self):
+        board = await self.start_board(keep_alive=True, close_after_response=0.05)
+        async with BoardClient("127.0.0.1", board.port) as client:
+            self.assertTrue((await client.send("list_hardware")).ok)
+            self.assertEqual(len(client._idle), 1)
+            await asyncio.sleep(0.2)  # The board drops the pooled connection
+
+            result = await client.send("start", "gpio_15")
+        self.assertTrue(result.ok)
+        self.assertEqual(result.attempts, 1)
+        self.assertEqual(board.connections, 2)
+        self.assertEqual(board.commands, ["list_hardware", "start"])
+
+
+class SummarizeTest(unittest.TestCase):
+
+    def test_summarize(self):
+        results = {
+            "a": CommandResult("a", "stop", ("gpio_15",), True, response="ok", attempts=1, elapsed=0.1),
+            "b": CommandResult("b", "stop", ("gpio_15",), True, response="ok", attempts=2, elapsed=0.3),
+            "c": CommandResult("c", "stop", ("gpio_15",), False, error="Timed out after 5.0s.", attempts=1, elapsed=5.0),
+        }
+        summary = FleetClient.summarize(results)
+        self.assertEqual(summary["total"], 3)
+        self.assertEqual(summary["ok"], 2)
+        self.assertEqual(summary["retried"], 1)
+        self.assertEqual(summary["failed"], {"c": ["stop: Timed out after 5.0s."]})
+        self.assertEqual(summary["latency_s"], {"min": 0.1, "median": 0.3, "p95": 5.0, "max": 5.0})
+
+    def test_summarize_empty(self):
+        self.assertEqual(FleetClient.summarize([]), {"total": 0, "ok": 0, "failed": {}, "retried": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
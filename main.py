@@ -3,6 +3,11 @@ from source.control_interface import ControlInterface
 from source.config_manager import ConfigManager
 from source.network_manager import NetworkManager
 from source.webserver import Webserver
+from source.memory_manager import MemoryManager
+from source.logger import Logger
+from source.telemetry_store import TelemetryStore
+from source.command_scheduler import CommandScheduler
+from source.background_runner import BackgroundRunner
 import time
 
 #Global ("app level") tasks
@@ -13,17 +18,33 @@ config_manager = ConfigManager(config_file=CONFIG_FILE)
 config_manager.load()
 
 # Initialize managers
+memory_manager = MemoryManager(config_manager)
+logger = Logger(config_manager)
 hardware_manager = HardwareManager(config_manager)
 network_manager = NetworkManager(config_manager)
+telemetry_store = TelemetryStore(config_manager, hardware_manager, logger)
 
 # Intialize control interface and webserver
-control_interface = ControlInterface(hardware_manager, config_manager, network_manager)
-webserver = Webserver(network_manager, control_interface, config_manager)
+control_interface = ControlInterface(hardware_manager, config_manager, network_manager, memory_manager, logger, telemetry_store)
+scheduler = CommandScheduler(control_interface, config_manager)
+control_interface.set_scheduler(scheduler)
+webserver = Webserver(network_manager, control_interface, config_manager, memory_manager, logger, scheduler)
+webserver.add_idle_task(telemetry_store.idle)
 control_interface.set_webserver(webserver)
 
+# Background tasks run from a timer whenever the webserver loop is not running them
+background_runner = BackgroundRunner(config_manager, logger)
+background_runner.add_task(scheduler.run_pending)
+background_runner.add_task(telemetry_store.idle)
+background_runner.add_task(logger.flush)
+
 def run_command(command_name, *args):
     """Execute a command and handle the response using the global hardware manager."""
-    response = control_interface.handle_command(command_name, *args)
+    background_runner.hold()
+    try:
+        response = control_interface.handle_command(command_name, *args)
+    finally:
+        background_runner.release()
     if (command_name != "start_webserver"):
         control_interface.send_response(response)
 
@@ -31,10 +52,17 @@ if __name__ == "__main__":
     # Print a new line, prevents parsing issues
     print('\n')
 
+    # Keep sampling and flushing logs when no webserver is running (e.g. serial only or Wi-Fi failed)
+    background_runner.start()
+
     # Check if the webserver should start on init using the config manager
     if config_manager.get("webserver.start_on_init", False):
-        # Start the webserver if configured to do so
-        webserver.start()
+        # Start the webserver if configured to do so, holding the runner while its loop runs the tasks
+        background_runner.hold()
+        try:
+            webserver.start()
+        finally:
+            background_runner.release()
 
     # Additional examples of other commands you may want to run after connecting:
     
@@ -0,0 +1,132 @@
+import time
+
+# Priority of each command class, lower values are dispatched first
+CLASS_PRIORITIES = {
+    'hardware': 0,
+    'query': 1,
+    'config': 2,
+    'network': 3,
+}
+LOWEST_PRIORITY = 3
+
+class AdmissionController:
+    """Class to queue incoming commands by priority and rate limit clients with token buckets."""
+
+    def __init__(self, config_manager, control_interface):
+        self.config_manager = config_manager
+        self.control_interface = control_interface  # Provides the class of each command
+
+        # Load admission config from ConfigManager, fallback to default values
+        self.admission_config = self.config_manager.get("admission", {})
+        self.queue_depth = self.admission_config.get("queue_depth", 8)
+        self.shedding_policy = self.admission_config.get("shedding_policy", "drop_lowest")  # "drop_lowest" or "reject_new"
+        self.rate_limit_capacity = self.admission_config.get("rate_limit_capacity", 10)  # Burst size per client, 0 disables rate limiting
+        self.rate_limit_refill = self.admission_config.get("rate_limit_refill", 5)  # Tokens added per second per client
+        self.max_clients = self.admission_config.get("max_clients", 16)  # Clients tracked before the least recent is forgotten
+
+        self.queues = [[] for _ in range(LOWEST_PRIORITY + 1)]  # One FIFO per priority
+        self.queued = 0
+        self.buckets = {}  # client -> [last seen in ticks_ms, [[tokens, last refill in ticks_ms] per command class priority]]
+        self.admitted = 0
+        self.rate_limited = 0
+        self.shed = 0
+
+    def get_priority(self, command):
+        """Return the queue priority of a command from its command class."""
+        return CLASS_PRIORITIES.get(self.control_interface.get_command_class(command), LOWEST_PRIORITY)
+
+    def allow_client(self, client, command=None):
+        """Take a token from the client's bucket for the command's class. Returns False if the client is over its rate limit.
+
+        Each command class has its own bucket, so a client polling queries cannot use up the
+        tokens of its own hardware writes.
+        """
+        if not self.rate_limit_capacity:
+            return True
+
+        now = time.ticks_ms()
+        entry = self.buckets.get(client)
+        if entry is None:
+            if len(self.buckets) >= self.max_clients:
+                # Forget the client that was seen least recently
+                oldest = None
+                for other, other_entry in self.buckets.items():
+                    if oldest is None or time.ticks_diff(other_entry[0], self.buckets[oldest][0]) < 0:
+                        oldest = other
+                del self.buckets[oldest]
+            entry = [now, [None] * (LOWEST_PRIORITY + 1)]
+            self.buckets[client] = entry
+        entry[0] = now
+
+        priority = self.get_priority(command)
+        bucket = entry[1][priority]
+        if bucket is None:
+            bucket = [self.rate_limit_capacity, now]
+            entry[1][priority] = bucket
+        else:
+            elapsed = time.ticks_diff(now, bucket[1])
+            bucket[0] = min(self.rate_limit_capacity, bucket[0] + elapsed * self.rate_limit_refill / 1000)
+            bucket[1] = now
+
+        if bucket[0] < 1:
+            self.rate_limited += 1
+            return False
+        bucket[0] -= 1
+        return True
+
+    def submit(self, command, request):
+        """Queue a request for a command.
+
+        When the queue is full the shedding policy decides what is dropped: "reject_new" refuses
+        the incoming request, "drop_lowest" evicts the newest request of a lower priority class
+        (or refuses the incoming one if there is none). Returns the shed request, or None.
+        """
+        priority = self.get_priority(command)
+        shed = None
+        if self.queued >= self.queue_depth:
+            if self.shedding_policy == "drop_lowest":
+                for victim_priority in range(LOWEST_PRIORITY, priority, -1):
+                    if self.queues[victim_priority]:
+                        shed = self.queues[victim_priority].pop()
+                        self.queued -= 1
+                        break
+            if shed is None:
+                self.shed += 1
+                return request
+            self.shed += 1
+
+        self.queues[priority].append(request)
+        self.queued += 1
+        self.admitted += 1
+        return shed
+
+    def next_request(self):
+        """Pop the oldest request of the highest priority class, or None if nothing is queued."""
+        for queue in self.queues:
+            if queue:
+                self.queued -= 1
+                return queue.pop(0)
+        return None
+
+    def pending(self):
+        """Return the number of queued requests."""
+        return self.queued
+
+    def get_stats(self):
+        """Return admission statistics as a dictionary."""
+        return {
+            "queued": {command_class: len(self.queues[priority]) for command_class, priority in CLASS_PRIORITIES.items()},
+            "queue_depth": self.queue_depth,
+            "shedding_policy": self.shedding_policy,
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "shed": self.shed,
+            "clients": len(self.buckets)
+        }
+
+    def apply_settings(self, settings):
+        """Apply settings from the given configuration and update the ConfigManager."""
+        for key in ("queue_depth", "shedding_policy", "rate_limit_capacity", "rate_limit_refill", "max_clients"):
+            if key in settings:
+                setattr(self, key, settings[key])
+                self.config_manager.set(f"admission.{key}", settings[key])
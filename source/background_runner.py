@@ -0,0 +1,64 @@
+from machine import Timer
+
+class BackgroundRunner:
+    """Class to run background tasks (scheduled commands, telemetry sampling, log flushing) from a periodic timer.
+
+    The webserver runs these tasks at its own idle points, but it only does so while its loop
+    is running. The timer keeps them going when Wi-Fi is unavailable or the board is only
+    driven over serial. Whoever already runs the tasks (the webserver loop, a serial command)
+    holds the runner meanwhile, so the timer never runs them in the middle of other work.
+    """
+
+    def __init__(self, config_manager, logger):
+        self.config_manager = config_manager
+        self.logger = logger
+
+        # Load background config from ConfigManager, fallback to default values
+        self.background_config = self.config_manager.get("background", {})
+        self.interval_ms = self.background_config.get("interval_ms", 10)  # Milliseconds between timer runs
+
+        self.tasks = []      # Callables run on every timer tick
+        self.holds = 0       # Number of callers currently holding the runner
+        self.running = False # Set while the tasks run, so a tick never re-enters them
+        self.timer = None
+
+    def add_task(self, task):
+        """Register a callable to run on every timer tick."""
+        self.tasks.append(task)
+
+    def hold(self):
+        """Stop the timer from running the tasks until release() is called."""
+        self.holds += 1
+
+    def release(self):
+        """Undo a hold()."""
+        self.holds = max(0, self.holds - 1)
+
+    def run(self):
+        """Run every task once, logging failures so one task cannot stop the others."""
+        if self.running:
+            return
+        self.running = True
+        try:
+            for task in self.tasks:
+                try:
+                    task()
+                except Exception as e:
+                    self.logger.error("Error in background task %s: %s", task, e)
+        finally:
+            self.running = False
+
+    def _on_timer(self, timer):
+        if not self.holds:
+            self.run()
+
+    def start(self):
+        """Start the periodic timer."""
+        if self.timer is None:
+            self.timer = Timer(period=self.interval_ms, mode=Timer.PERIODIC, callback=self._on_timer)
+
+    def stop(self):
+        """Stop the periodic timer."""
+        if self.timer is not None:
+            self.timer.deinit()
+            self.timer = None
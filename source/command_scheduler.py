@@ -0,0 +1,237 @@
+import heapq
+import time
+
+# Commands that cannot be scheduled: they block the server loop, take the server down or manage the schedule itself
+UNSCHEDULABLE_COMMANDS = ('start_webserver', 'stop_webserver', 'connect_wifi', 'schedule_timeline', 'cancel_scheduled', 'get_schedule_status')
+
+class ScheduledCommand:
+    """A command in the timeline, with its deadline, repeat settings and lateness statistics."""
+
+    def __init__(self, entry_id, command, args, deadline, repeat_interval=None, repeat_count=None):
+        self.entry_id = entry_id
+        self.command = command
+        self.args = args
+        self.deadline = deadline  # Scheduler clock milliseconds
+        self.repeat_interval = repeat_interval  # Milliseconds between runs, None to run once
+        self.repeat_count = repeat_count  # Total runs when repeating, None to repeat until cancelled
+        self.status = "pending"  # "pending", "done", "cancelled" or "error"
+        self.runs = 0
+        self.skipped = 0  # Repeats dropped because the scheduler fell a whole interval behind
+        self.last_result = None
+        self.lateness_min = None
+        self.lateness_max = None
+        self.lateness_total = 0
+        self.lateness_last = None
+
+    def record_run(self, lateness, result):
+        """Record a run that started lateness milliseconds after its deadline."""
+        self.runs += 1
+        self.last_result = result
+        self.lateness_last = lateness
+        self.lateness_total += lateness
+        if self.lateness_min is None or lateness < self.lateness_min:
+            self.lateness_min = lateness
+        if self.lateness_max is None or lateness > self.lateness_max:
+            self.lateness_max = lateness
+
+    def get_status(self):
+        """Return the status and lateness statistics as a dictionary."""
+        return {
+            "command": self.command,
+            "args": self.args,
+            "status": self.status,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "repeat_interval": self.repeat_interval,
+            "repeat_count": self.repeat_count,
+            "last_result": self.last_result,
+            "lateness_ms": {
+                "last": self.lateness_last,
+                "min": self.lateness_min,
+                "max": self.lateness_max,
+                "mean": self.lateness_total / self.runs if self.runs else None
+            }
+        }
+
+class CommandScheduler:
+    """Class to run ControlInterface commands at scheduled times from a deadline heap.
+
+    Deadlines are kept on a millisecond clock accumulated from time.ticks_ms, so they are plain
+    integers that never wrap and can be ordered by heapq. Cancelled entries are left in the heap
+    and skipped when they reach the top.
+    """
+
+    def __init__(self, control_interface, config_manager):
+        self.control_interface = control_interface
+        self.config_manager = config_manager
+
+        # Load scheduler config from ConfigManager, fallback to default values
+        self.scheduler_config = self.config_manager.get("scheduler", {})
+        self.max_entries = self.scheduler_config.get("max_entries", 32)  # Entries kept, including finished ones for status queries
+
+        self.entries = {}  # entry_id -> ScheduledCommand
+        self.heap = []     # (deadline, entry_id) of pending runs
+        self.next_id = 1
+        self.clock = 0     # Milliseconds since the scheduler started
+        self.last_ticks = time.ticks_ms()
+
+    def now(self):
+        """Advance and return the scheduler clock in milliseconds."""
+        ticks = time.ticks_ms()
+        self.clock += time.ticks_diff(ticks, self.last_ticks)
+        self.last_ticks = ticks
+        return self.clock
+
+    def _make_room(self, count):
+        """Forget the oldest finished entries until count new ones fit. Returns False if they cannot."""
+        if len(self.entries) + count <= self.max_entries:
+            return True
+        for entry_id in sorted(self.entries):
+            if self.entries[entry_id].status != "pending":
+                del self.entries[entry_id]
+                if len(self.entries) + count <= self.max_entries:
+                    return True
+        return False
+
+    def _entry_key(self, entry_id):
+        """Convert an entry ID (status replies key entries by string) to the integer key. Raises ValueError."""
+        try:
+            return int(entry_id)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid entry ID '{entry_id}'.")
+
+    def _int_field(self, item, key, default=None, optional=True):
+        """Return an integer field of a timeline entry, raising ValueError if it is not an integer (or None when optional)."""
+        value = item.get(key, default)
+        if value is None and optional:
+            return None
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError(f"{key} must be an integer.")
+        return value
+
+    def schedule(self, timeline):
+        """Schedule a list of entries, each a dict with "command", optional "args" and one of:
+
+        - "delay_ms": milliseconds after the timeline was received (shared by all its entries)
+        - "at_ticks_ms": an absolute time.ticks_ms() value on the board
+
+        plus optional "repeat_ms" and "repeat_count". The whole timeline is validated before
+        anything is scheduled; ValueError is raised for invalid entries. Returns the entry IDs.
+        """
+        base = self.now()
+        base_ticks = self.last_ticks
+        if not isinstance(timeline, list):
+            raise ValueError("Timeline must be a list of entries.")
+        pending = []
+        for item in timeline:
+            if not isinstance(item, dict):
+                raise ValueError("Timeline entries must be objects.")
+            command = item.get("command")
+            if command not in self.control_interface.commands or command in UNSCHEDULABLE_COMMANDS:
+                raise ValueError(f"Command '{command}' cannot be scheduled.")
+            args = item.get("args", [])
+            if not isinstance(args, list):
+                raise ValueError("args must be a list.")
+            if "at_ticks_ms" in item:
+                deadline = base + time.ticks_diff(self._int_field(item, "at_ticks_ms", optional=False), base_ticks)
+            else:
+                deadline = base + self._int_field(item, "delay_ms", 0, optional=False)
+            repeat_interval = self._int_field(item, "repeat_ms")
+            if repeat_interval is not None and repeat_interval <= 0:
+                raise ValueError("repeat_ms must be positive.")
+            repeat_count = self._int_field(item, "repeat_count")
+            if repeat_count is not None and repeat_count <= 0:
+                raise ValueError("repeat_count must be positive.")
+            pending.append((command, args, deadline, repeat_interval, repeat_count))
+
+        if not self._make_room(len(pending)):
+            raise ValueError(f"Schedule is full ({self.max_entries} entries).")
+
+        entry_ids = []
+        for command, args, deadline, repeat_interval, repeat_count in pending:
+            entry_id = self.next_id
+            self.next_id += 1
+            self.entries[entry_id] = ScheduledCommand(entry_id, command, args, deadline, repeat_interval, repeat_count)
+            heapq.heappush(self.heap, (deadline, entry_id))
+            entry_ids.append(entry_id)
+        return entry_ids
+
+    def _discard_cancelled(self):
+        """Pop heap entries that are no longer pending."""
+        while self.heap:
+            entry = self.entries.get(self.heap[0][1])
+            if entry is not None and entry.status == "pending":
+                return
+            heapq.heappop(self.heap)
+
+    def time_until_next(self):
+        """Return the milliseconds until the next pending deadline (0 if overdue), or None if nothing is pending."""
+        self._discard_cancelled()
+        if not self.heap:
+            return None
+        return max(0, self.heap[0][0] - self.now())
+
+    def run_pending(self):
+        """Run every entry whose deadline has passed. Returns the number of commands run."""
+        ran = 0
+        self._discard_cancelled()
+        while self.heap and self.heap[0][0] <= self.now():
+            deadline, entry_id = heapq.heappop(self.heap)
+            entry = self.entries.get(entry_id)
+            if entry is None or entry.status != "pending":
+                continue
+
+            lateness = self.now() - deadline
+            try:
+                result = self.control_interface.handle_command(entry.command, *entry.args)
+            except Exception as e:
+                entry.record_run(lateness, f"Error: {e}")
+                entry.status = "error"
+                continue
+            entry.record_run(lateness, result)
+            ran += 1
+
+            if entry.repeat_interval is None or (entry.repeat_count is not None and entry.runs >= entry.repeat_count):
+                entry.status = "done"
+                continue
+            # Keep the original cadence; runs missed by more than an interval are skipped, not bunched up
+            entry.deadline = deadline + entry.repeat_interval
+            now = self.now()
+            if entry.deadline <= now - entry.repeat_interval:
+                missed = (now - entry.deadline) // entry.repeat_interval
+                entry.deadline += missed * entry.repeat_interval
+                entry.skipped += missed
+            heapq.heappush(self.heap, (entry.deadline, entry_id))
+            self._discard_cancelled()
+        return ran
+
+    def cancel(self, entry_id=None):
+        """Cancel a pending entry, or all pending entries if entry_id is None. Returns the number cancelled.
+
+        Raises ValueError if entry_id is not an integer or a string holding one.
+        """
+        if entry_id is not None:
+            entry_id = self._entry_key(entry_id)
+            entries = [self.entries[entry_id]] if entry_id in self.entries else []
+        else:
+            entries = list(self.entries.values())
+        cancelled = 0
+        for entry in entries:
+            if entry.status == "pending":
+                entry.status = "cancelled"
+                cancelled += 1
+        return cancelled
+
+    def get_status(self, entry_id=None):
+        """Return the status of an entry, or of all entries keyed by entry ID. Returns None for unknown IDs.
+
+        Raises ValueError if entry_id is not an integer or a string holding one.
+        """
+        if entry_id is not None:
+            entry = self.entries.get(self._entry_key(entry_id))
+            return entry.get_status() if entry else None
+        return {
+            "ticks_ms": time.ticks_ms(),  # Reference for "at_ticks_ms" deadlines
+            "next_in_ms": self.time_until_next(),
+            "entries": {str(entry_id): entry.get_status() for entry_id, entry in self.entries.items()}
+        }
@@ -2,18 +2,30 @@ import sys
 from source.hardware import GPIOHardware, PWMHardware
 
 class ControlInterface:
-    def __init__(self, hardware_manager, config_manager, network_manager):
+    def __init__(self, hardware_manager, config_manager, network_manager, memory_manager=None, logger=None, telemetry_store=None):
         """Initialize the interface for controlling hardware components."""
         self.hardware_manager = hardware_manager
         self.config_manager = config_manager
         self.network_manager = network_manager  # Store the network manager instance
+        self.memory_manager = memory_manager  # Optional heap tracking, exposed through the memory commands
+        self.logger = logger  # Optional ring buffer logger, exposed through the logging commands
+        self.telemetry_store = telemetry_store  # Optional flash-backed history, exposed through the telemetry commands
         self.webserver = None  # Initialize webserver as None
+        self.scheduler = None  # Set with set_scheduler, the scheduler runs commands through this interface
         self.commands = {
             'apply_hardware_settings': self._apply_hardware_settings,
             'stop': self._stop,
             'create': self._create,
             'start': self._start,
             'delete': self._delete,
+            'list_hardware': self._list_hardware,
+            'create_group': self._create_group,
+            'delete_group': self._delete_group,
+            'start_group': self._start_group,
+            'stop_group': self._stop_group,
+            'apply_group_settings': self._apply_group_settings,
+            'set_group_values': self._set_group_values,
+            'list_groups': self._list_groups,
             'list_commands': self._list_commands,
             'get_config': self._get_config,
             'get_all_config': self._get_all_config,
@@ -26,27 +38,65 @@ class ControlInterface:
             'connect_wifi': self._connect_wifi,
             'start_webserver': self._start_webserver,  # New command to start webserver
             'stop_webserver': self._stop_webserver,    # New command to stop webserver
-            'apply_webserver_settings': self._apply_webserver_settings  # New command to apply webserver settings
+            'apply_webserver_settings': self._apply_webserver_settings,  # New command to apply webserver settings
+            'get_memory_stats': self._get_memory_stats,
+            'collect_garbage': self._collect_garbage,
+            'apply_memory_settings': self._apply_memory_settings,
+            'get_admission_stats': self._get_admission_stats,
+            'apply_admission_settings': self._apply_admission_settings,
+            'get_logs': self._get_logs,
+            'apply_logging_settings': self._apply_logging_settings,
+            'get_telemetry': self._get_telemetry,
+            'get_telemetry_stats': self._get_telemetry_stats,
+            'flush_telemetry': self._flush_telemetry,
+            'apply_telemetry_settings': self._apply_telemetry_settings,
+            'schedule_timeline': self._schedule_timeline,
+            'cancel_scheduled': self._cancel_scheduled,
+            'get_schedule_status': self._get_schedule_status
         }
+        # Parameters of each command, and its class ("hardware", "query", "config" or "network"),
+        # which the webserver's admission control uses to run hardware writes ahead of the rest
         self.command_params = {
-            'apply_hardware_settings': ['hardware_id', 'settings'],
-            'stop': ['hardware_id'],
-            'create': ['settings'],
-            'start': ['hardware_id'],
-            'delete': ['hardware_id'],
-            'list_commands': [],
-            'get_config': ['config_key'],
-            'get_all_config': [],
-            'set_config': ['config_key', 'value'],
-            'save_config': [],
-            'load_config': [],
-            'apply_config': [],
-            'delete_config_key': ['config_key'],
-            'set_wifi_credentials': ['ssid', 'password'],
-            'connect_wifi': [],
-            'start_webserver': [],  # No arguments needed for this command
-            'stop_webserver': [],   # No arguments needed for this command
-            'apply_webserver_settings': ['settings']  # Takes settings as arguments
+            'apply_hardware_settings': {'params': ['hardware_id', 'settings'], 'class': 'hardware'},
+            'stop': {'params': ['hardware_id'], 'class': 'hardware'},
+            'create': {'params': ['hardware_type', 'settings', 'hardware_id'], 'class': 'hardware'},
+            'start': {'params': ['hardware_id'], 'class': 'hardware'},
+            'delete': {'params': ['hardware_id'], 'class': 'hardware'},
+            'list_hardware': {'params': ['hardware_type', 'state'], 'class': 'query'},
+            'create_group': {'params': ['group_name', 'hardware_ids'], 'class': 'hardware'},
+            'delete_group': {'params': ['group_name'], 'class': 'hardware'},
+            'start_group': {'params': ['group_name'], 'class': 'hardware'},
+            'stop_group': {'params': ['group_name'], 'class': 'hardware'},
+            'apply_group_settings': {'params': ['group_name', 'settings'], 'class': 'hardware'},
+            'set_group_values': {'params': ['group_name', 'values'], 'class': 'hardware'},
+            'list_groups': {'params': [], 'class': 'query'},
+            'list_commands': {'params': [], 'class': 'query'},
+            'get_config': {'params': ['config_key'], 'class': 'config'},
+            'get_all_config': {'params': [], 'class': 'config'},
+            'set_config': {'params': ['config_key', 'value'], 'class': 'config'},
+            'save_config': {'params': [], 'class': 'config'},
+            'load_config': {'params': [], 'class': 'config'},
+            'apply_config': {'params': [], 'class': 'config'},
+            'delete_config_key': {'params': ['config_key'], 'class': 'config'},
+            'set_wifi_credentials': {'params': ['ssid', 'password'], 'class': 'network'},
+            'connect_wifi': {'params': [], 'class': 'network'},
+            'start_webserver': {'params': [], 'class': 'network'},  # No arguments needed for this command
+            'stop_webserver': {'params': [], 'class': 'network'},   # No arguments needed for this command
+            'apply_webserver_settings': {'params': ['settings'], 'class': 'network'},  # Takes settings as arguments
+            'get_memory_stats': {'params': [], 'class': 'query'},
+            'collect_garbage': {'params': [], 'class': 'config'},
+            'apply_memory_settings': {'params': ['settings'], 'class': 'config'},
+            'get_admission_stats': {'params': [], 'class': 'query'},
+            'apply_admission_settings': {'params': ['settings'], 'class': 'config'},
+            'get_logs': {'params': ['count', 'level'], 'class': 'query'},
+            'apply_logging_settings': {'params': ['settings'], 'class': 'config'},
+            'get_telemetry': {'params': ['start', 'end', 'hardware_id', 'kind', 'max_points', 'boot'], 'class': 'query'},
+            'get_telemetry_stats': {'params': [], 'class': 'query'},
+            'flush_telemetry': {'params': [], 'class': 'config'},
+            'apply_telemetry_settings': {'params': ['settings'], 'class': 'config'},
+            'schedule_timeline': {'params': ['timeline'], 'class': 'hardware'},
+            'cancel_scheduled': {'params': ['entry_id'], 'class': 'hardware'},
+            'get_schedule_status': {'params': ['entry_id'], 'class': 'query'}
         }
 
     def set_webserver(self, webserver):
@@ -54,11 +104,23 @@ class ControlInterface:
         self.webserver = webserver
         print("Webserver has been set.")
 
+    def set_scheduler(self, scheduler):
+        """Set the command scheduler instance."""
+        self.scheduler = scheduler
+
+    def get_command_class(self, command):
+        """Return the class of a command ("hardware", "query", "config" or "network").
+
+        Unknown commands get "network", the lowest priority, so they never jump ahead of other work.
+        """
+        details = self.command_params.get(command)
+        return details['class'] if details else "network"
+
     def _list_commands(self):
         """Return a list of available commands and their parameters."""
         command_list = []
         for command, details in self.command_params.items():
-            command_list.append(f"{command}({', '.join(details)})")
+            command_list.append(f"{command}({', '.join(details['params'])})")
         return "\n".join(command_list)
 
     def handle_command(self, command, *args):
@@ -73,9 +135,11 @@ class ControlInterface:
 
     def _apply_hardware_settings(self, hardware_id, settings):
         """Apply the settings to the specified hardware."""
-        hardware = self.hardware_manager.get_hardware(hardware_id)
-        if hardware:
-            hardware.apply_settings(settings)
+        try:
+            found = self.hardware_manager.update_hardware(hardware_id, settings)
+        except ValueError as e:
+            return f"Error: {e}"
+        if found:
             return f"Settings applied to hardware ID {hardware_id}: {settings}"
         else:
             return f"Error: Hardware ID {hardware_id} not found."
@@ -91,22 +155,17 @@ class ControlInterface:
 
     def _create(self, hardware_type, settings, hardware_id=None):
         """Create hardware with the given settings."""
-        # If hardware_id is not provided, generate a new one
-        if hardware_id is None:
-            hardware_id = self.hardware_manager.generate_hardware_id(hardware_type, settings)
-
-        # Check hardware type and create the appropriate hardware
-        if hardware_type == "pwm":
-            self.hardware_manager.add_hardware("pwm", settings, hardware_id)
-            return f"Created PWM hardware with ID {hardware_id}."
-
-        elif hardware_type == "gpio":
-            self.hardware_manager.add_hardware("gpio", settings, hardware_id)
-            return f"Created GPIO hardware with ID {hardware_id}."
-
-        else:
+        # Check hardware type before creating the appropriate hardware
+        if hardware_type not in ("pwm", "gpio"):
             return "Error: Unsupported hardware type."
 
+        # If hardware_id is not provided, the hardware manager generates one from the type and pin
+        try:
+            hardware_id = self.hardware_manager.add_hardware(hardware_type, settings, hardware_id)
+        except ValueError as e:
+            return f"Error: {e}"
+        return f"Created {hardware_type.upper()} hardware with ID {hardware_id}."
+
     def _start(self, hardware_id):
         """Start the hardware on the given hardware ID."""
         hardware = self.hardware_manager.get_hardware(hardware_id)
@@ -121,6 +180,77 @@ class ControlInterface:
         self.hardware_manager.remove_hardware(hardware_id)
         return f"Hardware with ID {hardware_id} deleted."
 
+    def _list_hardware(self, hardware_type=None, state=None):
+        """List hardware, optionally filtered by type ("gpio", "pwm") and state ("running", "stopped")."""
+        return [
+            {
+                "hardware_id": hardware.hardware_id,
+                "type": hardware.__class__.__name__,
+                "pin_number": hardware.pin_number,
+                "state": hardware.get_state()
+            }
+            for hardware in self.hardware_manager.list_hardware(hardware_type, state)
+        ]
+
+    def _create_group(self, group_name, hardware_ids):
+        """Create a named group of hardware IDs."""
+        try:
+            self.hardware_manager.create_group(group_name, hardware_ids)
+        except ValueError as e:
+            return f"Error: {e}"
+        return f"Created group '{group_name}' with hardware IDs {hardware_ids}."
+
+    def _delete_group(self, group_name):
+        """Delete a hardware group, leaving its hardware in place."""
+        if self.hardware_manager.remove_group(group_name):
+            return f"Group '{group_name}' deleted."
+        else:
+            return f"Error: Group '{group_name}' not found."
+
+    def _start_group(self, group_name):
+        """Start all hardware in a group."""
+        group = self.hardware_manager.get_group(group_name)
+        if group:
+            group.start()
+            return f"Group '{group_name}' started."
+        else:
+            return f"Error: Group '{group_name}' not found."
+
+    def _stop_group(self, group_name):
+        """Stop all hardware in a group."""
+        group = self.hardware_manager.get_group(group_name)
+        if group:
+            group.stop()
+            return f"Group '{group_name}' stopped."
+        else:
+            return f"Error: Group '{group_name}' not found."
+
+    def _apply_group_settings(self, group_name, settings):
+        """Apply the same settings to all hardware in a group."""
+        try:
+            direct = self.hardware_manager.apply_group_settings(group_name, settings)
+        except ValueError as e:
+            return f"Error: {e}"
+        if direct is None:
+            return f"Error: Group '{group_name}' not found."
+        mode = "simultaneously" if direct else "sequentially"
+        return f"Settings applied {mode} to group '{group_name}': {settings}"
+
+    def _set_group_values(self, group_name, values):
+        """Set per-hardware output values (hardware_id -> value) for a group."""
+        try:
+            direct = self.hardware_manager.write_group_values(group_name, values)
+        except ValueError as e:
+            return f"Error: {e}"
+        if direct is None:
+            return f"Error: Group '{group_name}' not found."
+        mode = "simultaneously" if direct else "sequentially"
+        return f"Values written {mode} to group '{group_name}': {values}"
+
+    def _list_groups(self):
+        """List hardware groups and their hardware IDs."""
+        return {name: group.hardware_ids for name, group in self.hardware_manager.groups.items()}
+
     def _get_config(self, config_key):
         """Retrieve a specific configuration value based on the key."""
         value = self.config_manager.get(config_key)
@@ -217,3 +347,126 @@ class ControlInterface:
         else:
             return "Error: Webserver not set."
 
+    def _get_memory_stats(self):
+        """Return heap statistics (free, allocated, watermarks, collections, rejections)."""
+        if self.memory_manager:
+            return self.memory_manager.get_stats()
+        else:
+            return "Error: Memory manager not set."
+
+    def _collect_garbage(self):
+        """Run a garbage collection and return the resulting heap statistics."""
+        if self.memory_manager:
+            self.memory_manager.collect()
+            return self.memory_manager.get_stats()
+        else:
+            return "Error: Memory manager not set."
+
+    def _apply_memory_settings(self, settings):
+        """Apply memory manager settings."""
+        if self.memory_manager:
+            self.memory_manager.apply_settings(settings)
+            return f"Memory settings applied: {settings}"
+        else:
+            return "Error: Memory manager not set."
+
+    def _get_admission_stats(self):
+        """Return the webserver's request queue and rate limiting statistics."""
+        if self.webserver:
+            return self.webserver.admission_controller.get_stats()
+        else:
+            return "Error: Webserver not set."
+
+    def _apply_admission_settings(self, settings):
+        """Apply request queue and rate limiting settings."""
+        if self.webserver:
+            self.webserver.admission_controller.apply_settings(settings)
+            return f"Admission settings applied: {settings}"
+        else:
+            return "Error: Webserver not set."
+
+    def _get_logs(self, count=None, level=None):
+        """Return the most recent buffered log lines, optionally limited to a count and minimum level."""
+        if self.logger:
+            return self.logger.get_logs(count, level)
+        else:
+            return "Error: Logger not set."
+
+    def _apply_logging_settings(self, settings):
+        """Apply logger settings (level, buffer_size, serial, file, flush_batch, max_arg_length)."""
+        if self.logger:
+            try:
+                self.logger.apply_settings(settings)
+            except ValueError as e:
+                return f"Error: {e}"
+            return f"Logging settings applied: {settings}"
+        else:
+            return "Error: Logger not set."
+
+    def _get_telemetry(self, start=None, end=None, hardware_id=None, kind=None, max_points=100, boot=None):
+        """Return recorded readings between start and end (milliseconds since the epoch), downsampled to max_points per series, optionally from one boot."""
+        if self.telemetry_store:
+            try:
+                return self.telemetry_store.query(start, end, hardware_id, kind, max_points, boot)
+            except KeyError:
+                return f"Error: Unknown telemetry kind '{kind}'."
+        else:
+            return "Error: Telemetry store not set."
+
+    def _get_telemetry_stats(self):
+        """Return telemetry storage statistics."""
+        if self.telemetry_store:
+            return self.telemetry_store.get_stats()
+        else:
+            return "Error: Telemetry store not set."
+
+    def _flush_telemetry(self):
+        """Write buffered telemetry records to flash."""
+        if self.telemetry_store:
+            written = self.telemetry_store.flush()
+            return f"Flushed {written} telemetry records."
+        else:
+            return "Error: Telemetry store not set."
+
+    def _apply_telemetry_settings(self, settings):
+        """Apply telemetry store settings."""
+        if self.telemetry_store:
+            self.telemetry_store.apply_settings(settings)
+            return f"Telemetry settings applied: {settings}"
+        else:
+            return "Error: Telemetry store not set."
+
+    def _schedule_timeline(self, timeline):
+        """Schedule a list of commands with "delay_ms" or "at_ticks_ms" deadlines and optional "repeat_ms"/"repeat_count"."""
+        if self.scheduler:
+            try:
+                entry_ids = self.scheduler.schedule(timeline)
+            except ValueError as e:
+                return f"Error: {e}"
+            return {"entry_ids": entry_ids}
+        else:
+            return "Error: Scheduler not set."
+
+    def _cancel_scheduled(self, entry_id=None):
+        """Cancel a scheduled entry, or every pending entry if no ID is given."""
+        if self.scheduler:
+            try:
+                cancelled = self.scheduler.cancel(entry_id)
+            except ValueError as e:
+                return f"Error: {e}"
+            return f"Cancelled {cancelled} scheduled entries."
+        else:
+            return "Error: Scheduler not set."
+
+    def _get_schedule_status(self, entry_id=None):
+        """Return the status and lateness statistics of a scheduled entry, or of all entries."""
+        if self.scheduler:
+            try:
+                status = self.scheduler.get_status(entry_id)
+            except ValueError as e:
+                return f"Error: {e}"
+            if status is None:
+                return f"Error: Scheduled entry {entry_id} not found."
+            return status
+        else:
+            return "Error: Scheduler not set."
@@ -1,6 +1,14 @@
 from machine import Pin, PWM, unique_id
 import ubinascii
 
+# Attributes holding runtime state rather than settings, which are never saved or taken from client settings
+RUNTIME_ATTRIBUTES = ("config_manager", "component", "running", "state_listener")
+
+def check_settings(settings):
+    """Raise ValueError if the settings try to set a runtime-only attribute."""
+    for key in RUNTIME_ATTRIBUTES:
+        if key in settings:
+            raise ValueError(f"'{key}' cannot be set through settings.")
 
 class Hardware:
     """Base class for hardware components."""
@@ -12,6 +20,8 @@ class Hardware:
         self.pin_number = pin_number
         self.component = None
         self.start_on_init = False
+        self.running = False
+        self.state_listener = None  # Called with this hardware whenever it starts or stops
 
         # Try to load settings from the config manager if available
         self._load_config()
@@ -45,17 +55,38 @@ class Hardware:
         self.config_manager.remove(config_path)  # Remove the configuration node
 
     def _get_settings(self):
-        """Get a dictionary of all settings excluding the config manager and component."""
-        return {k: v for k, v in self.__dict__.items() if k not in {"config_manager", "component"}}
-
-    def apply_settings(self, settings):
-        """Apply settings from a dictionary (or JSON object)."""
+        """Get a dictionary of all settings excluding the config manager, component and runtime state."""
+        return {k: v for k, v in self.__dict__.items() if k not in RUNTIME_ATTRIBUTES}
+
+    def get_config_entry(self):
+        """Return the type and settings as stored under hardware.<hardware_id> in the config."""
+        return {"type": self.__class__.__name__, "settings": self._get_settings()}
+
+    def _set_running(self, running):
+        """Record whether the hardware is running and notify the state listener."""
+        self.running = running
+        if self.state_listener:
+            self.state_listener(self)
+
+    def get_state(self):
+        """Return the runtime state of the hardware ("running" or "stopped")."""
+        return "running" if self.running else "stopped"
+
+    def apply_settings(self, settings, persist=True):
+        """Apply settings from a dictionary (or JSON object).
+
+        With persist=False the config is left untouched, so callers updating several
+        components (e.g. hardware groups) can write the config once at the end.
+        Raises ValueError for runtime-only attributes such as 'running'.
+        """
+        check_settings(settings)
         for key, value in settings.items():
             if hasattr(self, key):
                 setattr(self, key, value)
             else:
                 print(f"Warning: '{key}' not found as an attribute in {self.__class__.__name__}.")
-        self.update_config()
+        if persist:
+            self.update_config()
 
 
     def start(self):
@@ -75,19 +106,26 @@ class GPIOHardware(Hardware):
         self.mode = "OUT"
         super().__init__(pin_number, config_manager, hardware_id)
 
-    def start(self):
-        """Start the GPIO component."""
+    def start(self, drive_low=False):
+        """Start the GPIO component.
+
+        With drive_low an output starts low instead of at its value, for callers that write
+        the values of several pins at once afterwards (hardware groups).
+        """
         self.component = Pin(self.pin_number, Pin.OUT if self.mode == "OUT" else Pin.IN)
         if self.mode == "OUT":
-            self.component.value(self.value)
+            self.component.value(0 if drive_low else self.value)
+        self._set_running(True)
 
     def stop(self):
         """Stop the GPIO component."""
         if self.component:
             self.component.value(0)
+        self._set_running(False)
 
-    def apply_settings(self, settings):
+    def apply_settings(self, settings, persist=True):
         """Apply settings for GPIO hardware."""
+        check_settings(settings)  # Before any pin is touched
 
         # If the pin is part of the settings and it has changed, update the GPIO component
         if "pin_number" in settings and settings["pin_number"] != self.pin_number:
@@ -110,7 +148,7 @@ class GPIOHardware(Hardware):
                 self.component.value(self.value)
         
         # Apply settings for base class attributes
-        super().apply_settings(settings)
+        super().apply_settings(settings, persist)
 
 class PWMHardware(Hardware):
     """PWM hardware class that controls a PWM pin."""
@@ -130,14 +168,17 @@ class PWMHardware(Hardware):
             self.component.duty_u16(int(self.duty_cycle * 65535))
         else:
             self.component.duty_ns(self.pulse_width_ns)
+        self._set_running(True)
 
     def stop(self):
         """Stop the PWM component."""
         if self.component:
             self.component.deinit()
+        self._set_running(False)
 
-    def apply_settings(self, settings):
+    def apply_settings(self, settings, persist=True):
         """Apply settings for PWM hardware."""
+        check_settings(settings)  # Before any pin is touched
 
         # If the pin is part of the settings and it has changed, update the PWM component
         if "pin_number" in settings and settings["pin_number"] != self.pin_number:
@@ -161,7 +202,7 @@ class PWMHardware(Hardware):
             self.pulse_width_ns = settings["pulse_width_ns"]
 
         # Apply settings for base class attributes
-        super().apply_settings(settings)
+        super().apply_settings(settings, persist)
 
 
 
@@ -0,0 +1,139 @@
+from source.hardware import GPIOHardware
+
+try:
+    from machine import mem32
+except ImportError:
+    mem32 = None  # Ports without direct memory access fall back to per-pin writes
+
+# RP2040 single-cycle IO (SIO) GPIO output registers
+SIO_BASE = 0xD0000000
+GPIO_OUT = SIO_BASE + 0x010
+GPIO_OUT_SET = SIO_BASE + 0x014
+GPIO_OUT_CLR = SIO_BASE + 0x018
+GPIO_OUT_XOR = SIO_BASE + 0x01C
+
+
+class HardwareGroup:
+    """A named set of hardware that is started, stopped and updated together."""
+
+    def __init__(self, name, hardware_manager, hardware_ids):
+        """Initialize with the group name, HardwareManager instance and member hardware IDs."""
+        self.name = name
+        self.hardware_manager = hardware_manager
+        self.hardware_ids = list(hardware_ids)
+        self.gpio_mask = 0
+        self.refresh()
+
+    def members(self):
+        """Return the member hardware components."""
+        return [self.hardware_manager.get_hardware(hardware_id) for hardware_id in self.hardware_ids]
+
+    def refresh(self):
+        """Recompute the SIO pin bitmask of the GPIO members (call after membership or pin changes).
+
+        Only integer pins are SIO GPIOs; named pins such as "LED" (wired through the wireless chip on the Pico W) are left out.
+        """
+        mask = 0
+        for hardware in self.members():
+            if isinstance(hardware, GPIOHardware) and isinstance(hardware.pin_number, int):
+                mask |= 1 << hardware.pin_number
+        self.gpio_mask = mask
+
+    def remove_member(self, hardware_id):
+        """Remove a hardware ID from the group."""
+        if hardware_id in self.hardware_ids:
+            self.hardware_ids.remove(hardware_id)
+            self.refresh()
+
+    def _all_sio_outputs(self):
+        """Check whether every member is a GPIO output on an SIO pin."""
+        if mem32 is None or not self.hardware_ids:
+            return False
+        for hardware in self.members():
+            if not isinstance(hardware, GPIOHardware) or not isinstance(hardware.pin_number, int):
+                return False
+            if hardware.mode != "OUT":
+                return False
+        return True
+
+    def _can_write_directly(self):
+        """Check whether every member is a running GPIO output on an SIO pin, so the group can be written through SIO."""
+        if not self._all_sio_outputs():
+            return False
+        for hardware in self.members():
+            if not hardware.running:
+                return False
+        return True
+
+    def start(self):
+        """Start every member of the group.
+
+        When every member is a GPIO output, stopped members start driven low and their high
+        pins are then set in one SIO write, so all start edges happen at once.
+        """
+        if not self._all_sio_outputs():
+            for hardware in self.members():
+                hardware.start()
+            return
+
+        high = 0
+        for hardware in self.members():
+            if not hardware.running:  # Running members already drive their value
+                hardware.start(drive_low=True)
+                if hardware.value:
+                    high |= 1 << hardware.pin_number
+        if high:
+            mem32[GPIO_OUT_SET] = high
+
+    def stop(self):
+        """Stop every member of the group, driving running GPIO outputs low in one write."""
+        members = self.members()
+        if self._can_write_directly():
+            mem32[GPIO_OUT_CLR] = self.gpio_mask
+        for hardware in members:
+            hardware.stop()
+
+    def apply_settings(self, settings):
+        """Apply the same settings to every member without persisting them.
+
+        A value-only update of a running GPIO output group is written through the SIO
+        set/clear register, so all edges happen at once. Returns True if it was.
+        """
+        if list(settings.keys()) == ["value"] and self._can_write_directly():
+            value = settings["value"]
+            mem32[GPIO_OUT_SET if value else GPIO_OUT_CLR] = self.gpio_mask
+            for hardware in self.members():
+                hardware.value = value
+            return True
+
+        for hardware in self.members():
+            hardware.apply_settings(settings, persist=False)
+        return False
+
+    def write_values(self, values):
+        """Set output values for the group without persisting them.
+
+        values is a dict of hardware_id -> value. Running GPIO outputs are written through
+        the SIO XOR register in a single write. Returns True if they were.
+        """
+        for hardware_id in values:
+            if hardware_id not in self.hardware_ids:
+                raise ValueError(f"Hardware ID {hardware_id} is not in group '{self.name}'.")
+
+        if self._can_write_directly():
+            mask = 0
+            high = 0
+            for hardware_id, value in values.items():
+                hardware = self.hardware_manager.get_hardware(hardware_id)
+                bit = 1 << hardware.pin_number
+                mask |= bit
+                if value:
+                    high |= bit
+                hardware.value = value
+            # XOR flips exactly the masked bits that differ from the requested state
+            mem32[GPIO_OUT_XOR] = (mem32[GPIO_OUT] ^ high) & mask
+            return True
+
+        for hardware_id, value in values.items():
+            self.hardware_manager.get_hardware(hardware_id).apply_settings({"value": value}, persist=False)
+        return False
@@ -1,24 +1,104 @@
 import ujson as json
-from source.hardware import GPIOHardware, PWMHardware
-from machine import unique_id
+from source.hardware import GPIOHardware, PWMHardware, check_settings
+from source.hardware_group import HardwareGroup
+
+# Accepted hardware type names, mapped to their hardware class
+HARDWARE_TYPES = {
+    'gpio': GPIOHardware,
+    'GPIOHardware': GPIOHardware,
+    'pwm': PWMHardware,
+    'PWMHardware': PWMHardware,
+}
+
+# Canonical (short) type name for each hardware class, used for IDs and the type index
+HARDWARE_TYPE_NAMES = {
+    GPIOHardware: 'gpio',
+    PWMHardware: 'pwm',
+}
 
 class HardwareManager:
     def __init__(self, config_manager):
         self.config_manager = config_manager
-        self.hardware_map = {}
+        self.hardware_map = {}  # hardware_id -> hardware
+        self.pin_index = {}     # pin_number -> hardware_id
+        self.type_index = {}    # canonical type name -> set of hardware IDs
+        self.state_index = {"running": set(), "stopped": set()}  # state -> set of hardware IDs, kept current by the hardware
+        self.groups = {}        # group name -> HardwareGroup
         self.load_hardware()
 
+    def _canonical_type(self, hardware_type):
+        """Return the canonical type name ('gpio', 'pwm') for a hardware type, or None if unsupported."""
+        return HARDWARE_TYPE_NAMES.get(HARDWARE_TYPES.get(hardware_type))
+
+    def generate_hardware_id(self, hardware_type, settings):
+        """Generate a deterministic, collision-free hardware ID from the type and pin (e.g. 'gpio_15')."""
+        base_id = f"{self._canonical_type(hardware_type)}_{settings['pin_number']}"
+        hardware_id = base_id
+        suffix = 2
+        # Only collides if the ID was chosen explicitly elsewhere, so this rarely loops
+        while hardware_id in self.hardware_map or self.config_manager.get(f"hardware.{hardware_id}") is not None:
+            hardware_id = f"{base_id}_{suffix}"
+            suffix += 1
+        return hardware_id
+
+    def _check_pin(self, pin_number, hardware_id=None):
+        """Raise ValueError if the pin is already claimed by hardware other than hardware_id."""
+        owner = self.pin_index.get(pin_number)
+        if owner is not None and owner != hardware_id:
+            raise ValueError(f"Pin {pin_number} is already in use by hardware ID {owner}.")
+
+    def _index(self, hardware_id, hardware):
+        """Register hardware in the map and the secondary indexes."""
+        self.hardware_map[hardware_id] = hardware
+        self.pin_index[hardware.pin_number] = hardware_id
+        type_name = HARDWARE_TYPE_NAMES[hardware.__class__]
+        self.type_index.setdefault(type_name, set()).add(hardware_id)
+        self.state_index[hardware.get_state()].add(hardware_id)
+        hardware.state_listener = self._on_state_change
+
+    def _on_state_change(self, hardware):
+        """Move hardware to the state index matching its current state."""
+        for ids in self.state_index.values():
+            ids.discard(hardware.hardware_id)
+        self.state_index[hardware.get_state()].add(hardware.hardware_id)
+
+    def _unindex(self, hardware_id):
+        """Remove hardware from the map and the secondary indexes, returning it (or None)."""
+        hardware = self.hardware_map.pop(hardware_id, None)
+        if hardware is None:
+            return None
+        if self.pin_index.get(hardware.pin_number) == hardware_id:
+            del self.pin_index[hardware.pin_number]
+        ids = self.type_index.get(HARDWARE_TYPE_NAMES[hardware.__class__])
+        if ids:
+            ids.discard(hardware_id)
+        for ids in self.state_index.values():
+            ids.discard(hardware_id)
+        hardware.state_listener = None
+        return hardware
+
     def add_hardware(self, hardware_type, settings, hardware_id=None):
-        """Add hardware configuration to the hardware map."""
+        """Add hardware configuration to the hardware map.
+
+        Raises ValueError for unsupported types, missing pins, runtime-only settings, duplicate IDs and pin conflicts.
+        """
+        hardware_class = HARDWARE_TYPES.get(hardware_type)
+        if hardware_class is None:
+            raise ValueError(f"Unsupported hardware type '{hardware_type}'.")
+        if 'pin_number' not in settings:
+            raise ValueError("Settings must include 'pin_number'.")
+        check_settings(settings)
+
         # Ensure hardware_id is set if not provided
         if hardware_id is None:
-            hardware_id = str(unique_id())  # Generate a unique hardware_id if not provided
-        
-        # Create hardware instance based on type
-        if hardware_type == 'gpio' or hardware_type == 'GPIOHardware':
-            hardware = GPIOHardware(settings['pin_number'], self.config_manager, hardware_id=hardware_id)
-        elif hardware_type == 'pwm' or hardware_type == 'PWMHardware':
-            hardware = PWMHardware(settings['pin_number'], self.config_manager, hardware_id=hardware_id)
+            hardware_id = self.generate_hardware_id(hardware_type, settings)
+        elif hardware_id in self.hardware_map:
+            raise ValueError(f"Hardware ID {hardware_id} already exists.")
+
+        # Reject the hardware before touching the pin if another component owns it
+        self._check_pin(settings['pin_number'])
+
+        hardware = hardware_class(settings['pin_number'], self.config_manager, hardware_id=hardware_id)
 
         # Set up other settings (like pins, mode, duty cycle) from the configuration
         for key, value in settings.items():
@@ -26,37 +106,154 @@ class HardwareManager:
                 setattr(hardware, key, value)
         hardware.update_config()
 
-        # Store hardware in map with hardware ID as the key
-        self.hardware_map[hardware_id] = hardware
+        # Store hardware in map with hardware ID as the key, indexed by pin and type
+        self._index(hardware_id, hardware)
 
         return hardware_id
 
+    def update_hardware(self, hardware_id, settings):
+        """Apply settings to existing hardware, keeping the pin index consistent.
+
+        Returns False if the hardware does not exist; raises ValueError on a pin conflict.
+        """
+        hardware = self.hardware_map.get(hardware_id)
+        if hardware is None:
+            return False
+        old_pin = hardware.pin_number
+        if 'pin_number' in settings and settings['pin_number'] != old_pin:
+            self._check_pin(settings['pin_number'], hardware_id)
+        hardware.apply_settings(settings)
+        if hardware.pin_number != old_pin:
+            del self.pin_index[old_pin]
+            self.pin_index[hardware.pin_number] = hardware_id
+            self._refresh_groups(hardware_id)
+        return True
+
     def remove_hardware(self, hardware_id):
         """Remove hardware configuration from the hardware map."""
-        if hardware_id in self.hardware_map:
-            self.hardware_map[hardware_id].delete()
-            del self.hardware_map[hardware_id]
+        hardware = self._unindex(hardware_id)
+        if hardware:
+            hardware.delete()
+            for group in self.groups.values():
+                if hardware_id in group.hardware_ids:
+                    group.remove_member(hardware_id)
+                    self.config_manager.set(f"hardware_groups.{group.name}", group.hardware_ids)
 
     def get_hardware(self, hardware_id):
         """Retrieve the hardware component by hardware ID."""
         return self.hardware_map.get(hardware_id)
 
-    def list_hardware(self):
-        """List all hardware components."""
-        return list(self.hardware_map.values())
+    def get_hardware_by_pin(self, pin_number):
+        """Retrieve the hardware component using the given pin, or None."""
+        hardware_id = self.pin_index.get(pin_number)
+        return self.hardware_map.get(hardware_id) if hardware_id is not None else None
+
+    def list_hardware(self, hardware_type=None, state=None):
+        """List hardware components, optionally filtered by type and/or state ("running", "stopped")."""
+        if hardware_type is None and state is None:
+            return list(self.hardware_map.values())
+        ids = None
+        if hardware_type is not None:
+            ids = self.type_index.get(self._canonical_type(hardware_type), set())
+        if state is not None:
+            state_ids = self.state_index.get(state, set())
+            ids = state_ids if ids is None else ids & state_ids
+        return [self.hardware_map[hardware_id] for hardware_id in ids]
+
+    def _refresh_groups(self, hardware_id):
+        """Recompute the pin bitmasks of all groups containing the hardware ID."""
+        for group in self.groups.values():
+            if hardware_id in group.hardware_ids:
+                group.refresh()
+
+    def _save_hardware_configs(self, hardware_ids):
+        """Write the config of several hardware components with a single config update."""
+        hardware_config = self.config_manager.get('hardware', {})
+        for hardware_id in hardware_ids:
+            hardware_config[hardware_id] = self.hardware_map[hardware_id].get_config_entry()
+        self.config_manager.set('hardware', hardware_config)
+
+    def create_group(self, group_name, hardware_ids):
+        """Create a named hardware group. Raises ValueError for duplicate names or unknown hardware."""
+        if group_name in self.groups:
+            raise ValueError(f"Group '{group_name}' already exists.")
+        for hardware_id in hardware_ids:
+            if hardware_id not in self.hardware_map:
+                raise ValueError(f"Hardware ID {hardware_id} not found.")
+        group = HardwareGroup(group_name, self, hardware_ids)
+        self.groups[group_name] = group
+        self.config_manager.set(f"hardware_groups.{group_name}", group.hardware_ids)
+        return group
+
+    def remove_group(self, group_name):
+        """Remove a hardware group (its hardware is left untouched). Returns success as a boolean."""
+        if group_name not in self.groups:
+            return False
+        del self.groups[group_name]
+        self.config_manager.remove(f"hardware_groups.{group_name}")
+        return True
+
+    def get_group(self, group_name):
+        """Retrieve a hardware group by name."""
+        return self.groups.get(group_name)
+
+    def apply_group_settings(self, group_name, settings):
+        """Apply the same settings to every group member, updating the config once.
+
+        Returns whether the values were written simultaneously through SIO, or None if the group does not exist.
+        """
+        group = self.groups.get(group_name)
+        if group is None:
+            return None
+        if 'pin_number' in settings:
+            raise ValueError("Pin numbers cannot be applied to a whole group.")
+        check_settings(settings)
+        direct = group.apply_settings(settings)
+        self._save_hardware_configs(group.hardware_ids)
+        return direct
+
+    def write_group_values(self, group_name, values):
+        """Set per-member output values (hardware_id -> value) for a group, updating the config once.
+
+        Returns whether the values were written simultaneously through SIO, or None if the group does not exist.
+        """
+        group = self.groups.get(group_name)
+        if group is None:
+            return None
+        direct = group.write_values(values)
+        self._save_hardware_configs(values.keys())
+        return direct
+
+    def load_groups(self):
+        """Load hardware groups from the config manager, skipping hardware that no longer exists."""
+        self.groups = {}
+        groups_config = self.config_manager.get('hardware_groups', {})
+        if (groups_config):
+            for group_name, hardware_ids in groups_config.items():
+                # A bad group entry must never stop the board from booting
+                try:
+                    hardware_ids = [hardware_id for hardware_id in hardware_ids if hardware_id in self.hardware_map]
+                    self.groups[group_name] = HardwareGroup(group_name, self, hardware_ids)
+                except Exception as e:
+                    print(f"Warning: Skipping hardware group '{group_name}': {e}")
 
     def load_hardware(self):
         """Load hardware configurations from the config manager."""
-        # Stop and delete all existing hardware
+        # Stop and unregister all existing hardware, keeping its configuration so it can be reloaded
         for hardware_id in list(self.hardware_map.keys()):
-            self.hardware_map[hardware_id].stop()  # Stop the hardware
-            self.remove_hardware(hardware_id)     # Remove from hardware map
+            self._unindex(hardware_id).stop()
 
         # Load new hardware configurations from config
         hardware_config = self.config_manager.get('hardware', {})
         if (hardware_config):
-            for hardware_id, data in hardware_config.items():
+            for hardware_id, data in list(hardware_config.items()):
                 hardware_type = data.get('type')
                 settings = data.get('settings', {})
                 # Ensure a valid hardware_id is passed for each item
-                self.add_hardware(hardware_type, settings, hardware_id)
+                try:
+                    self.add_hardware(hardware_type, settings, hardware_id)
+                except ValueError as e:
+                    print(f"Warning: Skipping hardware ID {hardware_id}: {e}")
+
+        # Groups reference hardware IDs, so they are rebuilt once the hardware is loaded
+        self.load_groups()
@@ -0,0 +1,176 @@
+import time
+
+# Log levels
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVELS = {
+    "DEBUG": DEBUG,
+    "INFO": INFO,
+    "WARNING": WARNING,
+    "ERROR": ERROR,
+}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+
+# Arguments stored as they are (immutable); anything else is snapshotted as (truncated) text when logged
+PLAIN_TYPES = (str, int, float, bool, type(None))
+
+class Logger:
+    """Class to record leveled log messages in a fixed-size RAM ring buffer and flush them at idle points.
+
+    Messages are stored unformatted (message and arguments) and only formatted when flushed
+    or read, so logging on the request path never blocks on serial or flash.
+    """
+
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+
+        # Load logging config from ConfigManager, fallback to default values
+        self.logging_config = self.config_manager.get("logging", {})
+        self.level = LEVELS.get(self.logging_config.get("level", "INFO"), INFO)
+        self.buffer_size = self.logging_config.get("buffer_size", 64)  # Number of entries kept in RAM
+        self.serial = self.logging_config.get("serial", True)  # Flush entries to stdout
+        self.file = self.logging_config.get("file", None)  # Optional file entries are appended to
+        self.flush_batch = self.logging_config.get("flush_batch", 8)  # Entries written per idle flush
+        self.max_arg_length = self.logging_config.get("max_arg_length", 80)  # Characters kept of each non-numeric argument
+        if self.buffer_size < 1:
+            print(f"Warning: Invalid logging buffer_size {self.buffer_size}, using 64.")
+            self.buffer_size = 64
+
+        self.entries = [None] * self.buffer_size
+        self.next_seq = 0     # Sequence number of the next entry, stored at slot next_seq % buffer_size
+        self.flushed_seq = 0  # Sequence number of the oldest entry not flushed yet
+        self.dropped = 0      # Entries overwritten before they could be flushed
+
+    def is_enabled(self, level):
+        """Check whether messages of the given level are recorded."""
+        return level >= self.level
+
+    def _snapshot(self, arg):
+        """Return the argument as stored in the buffer: strings and numbers as they are, anything else as truncated text.
+
+        Keeping a reference to a live object would hold on to large payloads and show later mutations.
+        """
+        if isinstance(arg, PLAIN_TYPES):
+            return arg
+        text = str(arg)
+        if len(text) > self.max_arg_length:
+            text = text[:self.max_arg_length] + "..."
+        return text
+
+    def log(self, level, message, *args):
+        """Record a message, formatted later as message % args."""
+        if level < self.level:
+            return
+        if args:
+            args = tuple(self._snapshot(arg) for arg in args)
+        self.entries[self.next_seq % self.buffer_size] = (time.ticks_ms(), level, message, args)
+        self.next_seq += 1
+        if self.next_seq - self.flushed_seq > self.buffer_size:
+            self.dropped += 1
+            self.flushed_seq = self.next_seq - self.buffer_size
+
+    def debug(self, message, *args):
+        if self.level <= DEBUG:
+            self.log(DEBUG, message, *args)
+
+    def info(self, message, *args):
+        if self.level <= INFO:
+            self.log(INFO, message, *args)
+
+    def warning(self, message, *args):
+        if self.level <= WARNING:
+            self.log(WARNING, message, *args)
+
+    def error(self, message, *args):
+        self.log(ERROR, message, *args)
+
+    def _format(self, entry):
+        """Format a buffered entry as a line of text."""
+        ticks, level, message, args = entry
+        if args:
+            try:
+                message = message % args
+            except Exception:
+                message = f"{message} {args}"
+        return f"[{ticks}] {LEVEL_NAMES.get(level, level)}: {message}"
+
+    def flush(self, max_entries=None):
+        """Write up to max_entries unflushed entries to the serial and file outputs. Returns the number written."""
+        if not self.serial and not self.file:
+            self.flushed_seq = self.next_seq
+            return 0
+
+        lines = []
+        while self.flushed_seq < self.next_seq and (max_entries is None or len(lines) < max_entries):
+            lines.append(self._format(self.entries[self.flushed_seq % self.buffer_size]))
+            self.flushed_seq += 1
+        if not lines:
+            return 0
+
+        if self.serial:
+            for line in lines:
+                print(line)
+        if self.file:
+            try:
+                with open(self.file, 'a') as file:
+                    file.write("\n".join(lines) + "\n")
+            except OSError as e:
+                print(f"Error writing log file: {e}")
+        return len(lines)
+
+    def get_logs(self, count=None, level=None):
+        """Return the most recent buffered entries (oldest first) as formatted lines, optionally filtered by minimum level."""
+        min_level = LEVELS.get(level, DEBUG) if level is not None else DEBUG
+        lines = []
+        seq = self.next_seq - 1
+        oldest = max(0, self.next_seq - self.buffer_size)
+        while seq >= oldest and (count is None or len(lines) < count):
+            entry = self.entries[seq % self.buffer_size]
+            if entry[1] >= min_level:
+                lines.append(self._format(entry))
+            seq -= 1
+        lines.reverse()
+        return lines
+
+    def get_stats(self):
+        """Return logging statistics as a dictionary."""
+        return {
+            "level": LEVEL_NAMES.get(self.level, self.level),
+            "buffered": min(self.next_seq, self.buffer_size),
+            "pending": self.next_seq - self.flushed_seq,
+            "logged": self.next_seq,
+            "dropped": self.dropped
+        }
+
+    def apply_settings(self, settings):
+        """Apply settings from the given configuration and update the ConfigManager.
+
+        Raises ValueError if buffer_size is smaller than 1.
+        """
+        if "buffer_size" in settings and (not isinstance(settings["buffer_size"], int) or settings["buffer_size"] < 1):
+            raise ValueError(f"Invalid buffer_size {settings['buffer_size']}, must be at least 1.")
+
+        if "level" in settings:
+            self.level = LEVELS.get(settings["level"], self.level)
+            self.config_manager.set("logging.level", LEVEL_NAMES[self.level])
+
+        if "buffer_size" in settings and settings["buffer_size"] != self.buffer_size:
+            # Keep the most recent entries that fit in the new buffer, in order
+            kept = [self.entries[seq % self.buffer_size] for seq in range(max(0, self.next_seq - self.buffer_size), self.next_seq)]
+            pending = self.next_seq - self.flushed_seq
+            self.buffer_size = settings["buffer_size"]
+            kept = kept[-self.buffer_size:]
+            self.entries = [None] * self.buffer_size
+            for seq, entry in enumerate(kept):
+                self.entries[seq] = entry
+            self.next_seq = len(kept)
+            self.flushed_seq = self.next_seq - min(pending, len(kept))
+            self.config_manager.set("logging.buffer_size", self.buffer_size)
+
+        for key in ("serial", "file", "flush_batch", "max_arg_length"):
+            if key in settings:
+                setattr(self, key, settings[key])
+                self.config_manager.set(f"logging.{key}", settings[key])
@@ -0,0 +1,113 @@
+import gc
+
+# Commands that are still admitted when the heap is low: stopping or writing hardware must
+# not be refused just because config reads and other requests have fragmented the heap.
+DEFAULT_CRITICAL_COMMANDS = [
+    'stop',
+    'stop_group',
+    'apply_hardware_settings',
+    'apply_group_settings',
+    'set_group_values',
+    'cancel_scheduled',
+    'get_memory_stats',
+]
+
+class MemoryManager:
+    """Class to track heap usage, collect garbage at idle points and refuse work when memory is low."""
+
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+
+        # Load memory config from ConfigManager, fallback to default values
+        self.memory_config = self.config_manager.get("memory", {})
+        self.low_memory_threshold = self.memory_config.get("low_memory_threshold", 16384)  # Free bytes below which non-critical work is rejected
+        self.collect_interval = self.memory_config.get("collect_interval", 8192)  # Bytes allocated since the last collection before an idle collection
+        self.gc_threshold = self.memory_config.get("gc_threshold", None)  # Optional automatic collection threshold passed to gc.threshold
+        self.critical_commands = self.memory_config.get("critical_commands", DEFAULT_CRITICAL_COMMANDS)
+
+        # Statistics
+        self.min_free = None  # Low watermark of free heap
+        self.max_alloc = 0    # High watermark of allocated heap
+        self.collections = 0
+        self.rejected = 0
+        self.alloc_after_collect = 0
+
+        if self.gc_threshold is not None:
+            gc.threshold(self.gc_threshold)
+        self.collect()
+
+    def update_watermarks(self):
+        """Sample the heap and update the high/low watermarks. Returns the free heap in bytes."""
+        free = gc.mem_free()
+        alloc = gc.mem_alloc()
+        if self.min_free is None or free < self.min_free:
+            self.min_free = free
+        if alloc > self.max_alloc:
+            self.max_alloc = alloc
+        return free
+
+    def collect(self):
+        """Run a garbage collection, recording the heap state before it."""
+        self.update_watermarks()
+        gc.collect()
+        self.collections += 1
+        self.alloc_after_collect = gc.mem_alloc()
+
+    def idle(self):
+        """Collect garbage at an idle point if enough has been allocated since the last collection."""
+        if gc.mem_alloc() - self.alloc_after_collect >= self.collect_interval:
+            self.collect()
+        else:
+            self.update_watermarks()
+
+    def is_critical(self, command):
+        """Check whether a command is admitted regardless of free heap."""
+        return command in self.critical_commands
+
+    def admit(self, command=None):
+        """Check whether there is enough free heap to run the command.
+
+        Critical commands are always admitted. Otherwise a collection is attempted before
+        refusing, and refusals are counted in the statistics.
+        """
+        free = self.update_watermarks()
+        if free >= self.low_memory_threshold or self.is_critical(command):
+            return True
+        self.collect()
+        if gc.mem_free() >= self.low_memory_threshold:
+            return True
+        self.rejected += 1
+        return False
+
+    def get_stats(self):
+        """Return heap statistics as a dictionary."""
+        free = self.update_watermarks()
+        return {
+            "free": free,
+            "alloc": gc.mem_alloc(),
+            "min_free": self.min_free,
+            "max_alloc": self.max_alloc,
+            "low_memory_threshold": self.low_memory_threshold,
+            "low_memory": free < self.low_memory_threshold,
+            "collections": self.collections,
+            "rejected": self.rejected
+        }
+
+    def apply_settings(self, settings):
+        """Apply settings from the given configuration and update the ConfigManager."""
+        if "low_memory_threshold" in settings:
+            self.low_memory_threshold = settings["low_memory_threshold"]
+            self.config_manager.set("memory.low_memory_threshold", self.low_memory_threshold)
+
+        if "collect_interval" in settings:
+            self.collect_interval = settings["collect_interval"]
+            self.config_manager.set("memory.collect_interval", self.collect_interval)
+
+        if "gc_threshold" in settings:
+            self.gc_threshold = settings["gc_threshold"]
+            gc.threshold(self.gc_threshold if self.gc_threshold is not None else -1)
+            self.config_manager.set("memory.gc_threshold", self.gc_threshold)
+
+        if "critical_commands" in settings:
+            self.critical_commands = settings["critical_commands"]
+            self.config_manager.set("memory.critical_commands", self.critical_commands)
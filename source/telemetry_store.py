@@ -0,0 +1,380 @@
+import os
+import json
+import struct
+import time
+from source.hardware import GPIOHardware, PWMHardware
+from source.logger import Logger
+
+# Fixed-size record: seconds, milliseconds, channel, boot, kind, pad, value (16 bytes, so records never straddle flash blocks)
+RECORD_FORMAT = "<IHHHBxf"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+# Kinds of reading stored per hardware channel
+KINDS = {
+    "state": 0,
+    "value": 1,
+    "frequency": 2,
+    "duty_cycle": 3,
+    "pulse_width_ns": 4,
+}
+KIND_NAMES = {number: name for name, number in KINDS.items()}
+
+SEGMENT_PREFIX = "tlm_"
+LEGACY_SEGMENT_PREFIX = "seg_"  # Segments in the earlier record format without a boot number, which cannot be read back
+CHANNELS_FILE = "channels.json"
+
+class TelemetryStore:
+    """Class to record hardware readings into append-only, size-bounded binary segment files.
+
+    Records are buffered in RAM and appended a batch at a time to limit flash wear. When the
+    current segment is full a new one is started, and the oldest segments are deleted once
+    max_segments exist. Hardware IDs are mapped to small channel numbers kept in channels.json.
+
+    The board clock restarts on every boot unless it is set, so each record also carries a boot
+    number (one more than the highest found on flash at startup). The time range of every boot
+    in every segment is kept in RAM, scanned once at startup, so queries only skip segments that
+    hold nothing in range.
+
+    Sampling is off unless telemetry.sample_interval is set, and a sampled reading is only
+    recorded when it moved by more than telemetry.deadband since the last one recorded, so an
+    idle board does not keep writing the same values to flash.
+    """
+
+    def __init__(self, config_manager, hardware_manager, logger=None):
+        self.config_manager = config_manager
+        self.hardware_manager = hardware_manager
+        self.logger = logger or Logger(config_manager)
+
+        # Load telemetry config from ConfigManager, fallback to default values
+        self.telemetry_config = self.config_manager.get("telemetry", {})
+        self.directory = self.telemetry_config.get("directory", "telemetry")
+        self.segment_size = self.telemetry_config.get("segment_size", 16384)  # Bytes per segment file
+        self.max_segments = self.telemetry_config.get("max_segments", 8)  # Oldest segments are deleted past this
+        self.batch_records = self.telemetry_config.get("batch_records", 32)  # Records buffered before a flash write
+        self.flush_interval = self.telemetry_config.get("flush_interval", 60)  # Seconds before a partial batch is written
+        self.sample_interval = self.telemetry_config.get("sample_interval", 0)  # Milliseconds between samples, 0 disables sampling
+        self.deadband = self.telemetry_config.get("deadband", 0)  # Sampled changes up to this size are not recorded
+        self.max_reply_points = self.telemetry_config.get("max_reply_points", 300)  # Buckets per query reply, across all series
+
+        self.buffer = bytearray(self.batch_records * RECORD_SIZE)
+        self.buffered = 0
+        self.buffered_range = None  # [min_ms, max_ms] of the buffered records
+        self.last_flush = time.time()
+        self.last_sample = time.ticks_ms()
+        self.records_written = 0
+        self.records_dropped = 0   # Buffered records lost because they could not be written
+        self.readings_skipped = 0  # Sampled values that were not numbers
+        self.readings_unchanged = 0  # Sampled values within the deadband of the last recorded one
+        self.last_recorded = {}  # (hardware_id, kind) -> last sampled value recorded
+        self.series = set()  # (channel, kind) pairs stored, to size query replies
+
+        self._ensure_directory()
+        self._remove_legacy_segments()
+        self.segments = self._list_segments()
+        self.ranges = {number: self._scan_segment(number) for number in self.segments}  # segment -> {boot: [min_ms, max_ms]}
+        last_boot = -1
+        for boot_ranges in self.ranges.values():
+            for boot in boot_ranges:
+                last_boot = max(last_boot, boot)
+        self.boot = (last_boot + 1) % 65536
+        self.channels = self._load_channels()
+        self.channel_ids = {channel: hardware_id for hardware_id, channel in self.channels.items()}
+
+    def _ensure_directory(self):
+        try:
+            os.mkdir(self.directory)
+        except OSError:
+            pass  # Already exists
+
+    def _remove_legacy_segments(self):
+        for name in os.listdir(self.directory):
+            if name.startswith(LEGACY_SEGMENT_PREFIX) and name.endswith(".bin"):
+                self.logger.warning("Removing telemetry segment %s in the old record format.", name)
+                try:
+                    os.remove(f"{self.directory}/{name}")
+                except OSError:
+                    pass
+
+    def _list_segments(self):
+        """Return the existing segment numbers, oldest first."""
+        return sorted(int(name[len(SEGMENT_PREFIX):-4]) for name in os.listdir(self.directory)
+                      if name.startswith(SEGMENT_PREFIX) and name.endswith(".bin"))
+
+    def _segment_path(self, number):
+        return f"{self.directory}/{SEGMENT_PREFIX}{number:06d}.bin"
+
+    def _read_segment(self, number):
+        """Yield (timestamp_ms, channel, boot, kind, value) for the records of a segment."""
+        try:
+            file = open(self._segment_path(number), "rb")
+        except OSError:
+            return
+        with file:
+            while True:
+                chunk = file.read(RECORD_SIZE * 32)
+                if not chunk:
+                    break
+                for offset in range(0, len(chunk) - RECORD_SIZE + 1, RECORD_SIZE):
+                    seconds, millis, channel, boot, kind, value = struct.unpack_from(RECORD_FORMAT, chunk, offset)
+                    yield seconds * 1000 + millis, channel, boot, kind, value
+
+    def _scan_segment(self, number):
+        """Return the time range of each boot in a segment as {boot: [min_ms, max_ms]}."""
+        ranges = {}
+        for timestamp, channel, boot, kind, _ in self._read_segment(number):
+            self._extend_range(ranges, boot, timestamp, timestamp)
+            self.series.add((channel, kind))
+        return ranges
+
+    @staticmethod
+    def _extend_range(ranges, boot, first, last):
+        boot_range = ranges.get(boot)
+        if boot_range is None:
+            ranges[boot] = [first, last]
+        else:
+            boot_range[0] = min(boot_range[0], first)
+            boot_range[1] = max(boot_range[1], last)
+
+    def _load_channels(self):
+        try:
+            with open(f"{self.directory}/{CHANNELS_FILE}", "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _get_channel(self, hardware_id):
+        """Return the channel number of a hardware ID, assigning (and persisting) a new one if needed."""
+        channel = self.channels.get(hardware_id)
+        if channel is None:
+            channel = len(self.channels)
+            self.channels[hardware_id] = channel
+            self.channel_ids[channel] = hardware_id
+            with open(f"{self.directory}/{CHANNELS_FILE}", "w") as file:
+                json.dump(self.channels, file)
+        return channel
+
+    def record(self, hardware_id, kind, value, timestamp_ns=None):
+        """Buffer a reading, writing the batch to flash once it is full."""
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns()
+        timestamp_ms = timestamp_ns // 1000000
+        channel = self._get_channel(hardware_id)
+        struct.pack_into(RECORD_FORMAT, self.buffer, self.buffered * RECORD_SIZE, timestamp_ms // 1000, timestamp_ms % 1000,
+                         channel, self.boot, KINDS[kind], value)
+        self.series.add((channel, KINDS[kind]))
+        self.buffered += 1
+        if self.buffered_range is None:
+            self.buffered_range = [timestamp_ms, timestamp_ms]
+        else:
+            self.buffered_range[0] = min(self.buffered_range[0], timestamp_ms)
+            self.buffered_range[1] = max(self.buffered_range[1], timestamp_ms)
+        if self.buffered >= self.batch_records:
+            self.flush()
+
+    def _record_reading(self, hardware_id, kind, value, timestamp_ns, deadband=None):
+        """Record a sampled value if it changed by more than the deadband (telemetry.deadband by default).
+
+        Values that are not numbers (e.g. a setting stored as a string) are skipped.
+        """
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            self.readings_skipped += 1
+            return
+        key = (hardware_id, kind)
+        last = self.last_recorded.get(key)
+        if last is not None and abs(value - last) <= (self.deadband if deadband is None else deadband):
+            self.readings_unchanged += 1
+            return
+        self.last_recorded[key] = value
+        self.record(hardware_id, kind, value, timestamp_ns)
+
+    def sample(self):
+        """Record the state and current readings of every hardware component that changed since the last sample."""
+        timestamp_ns = time.time_ns()
+        for hardware in self.hardware_manager.list_hardware():
+            self._record_reading(hardware.hardware_id, "state", 1 if hardware.running else 0, timestamp_ns, deadband=0)
+            if isinstance(hardware, GPIOHardware):
+                value = hardware.value
+                if hardware.running and hardware.mode != "OUT":
+                    value = hardware.component.value()  # Read inputs from the pin
+                self._record_reading(hardware.hardware_id, "value", value, timestamp_ns)
+            elif isinstance(hardware, PWMHardware):
+                self._record_reading(hardware.hardware_id, "frequency", hardware.frequency, timestamp_ns)
+                if hardware.duty_cycle is not None:
+                    self._record_reading(hardware.hardware_id, "duty_cycle", hardware.duty_cycle, timestamp_ns)
+                else:
+                    self._record_reading(hardware.hardware_id, "pulse_width_ns", hardware.pulse_width_ns, timestamp_ns)
+
+    def flush(self):
+        """Append the buffered records to the current segment, rotating segments as needed.
+
+        If the write fails (e.g. the filesystem is full) the batch is dropped, so the buffer never overflows.
+        """
+        if not self.buffered:
+            return 0
+        size = self.buffered * RECORD_SIZE
+        if not self.segments:
+            self.segments.append(0)
+        path = self._segment_path(self.segments[-1])
+        try:
+            current_size = os.stat(path)[6]
+        except OSError:
+            current_size = 0
+        if current_size and current_size + size > self.segment_size:
+            self._rotate()
+            path = self._segment_path(self.segments[-1])
+
+        try:
+            with open(path, "ab") as file:
+                file.write(memoryview(self.buffer)[:size])
+        except OSError as e:
+            self.logger.error("Dropping %d telemetry records, write failed: %s", self.buffered, e)
+            self.records_dropped += self.buffered
+            self.buffered = 0
+            self.buffered_range = None
+            self.last_flush = time.time()
+            return 0
+        self._extend_range(self.ranges.setdefault(self.segments[-1], {}), self.boot, *self.buffered_range)
+        written = self.buffered
+        self.records_written += written
+        self.buffered = 0
+        self.buffered_range = None
+        self.last_flush = time.time()
+        return written
+
+    def _rotate(self):
+        """Start a new segment and delete the oldest ones past max_segments."""
+        self.segments.append(self.segments[-1] + 1)
+        while len(self.segments) > self.max_segments:
+            number = self.segments.pop(0)
+            self.ranges.pop(number, None)
+            try:
+                os.remove(self._segment_path(number))
+            except OSError:
+                pass
+
+    def idle(self):
+        """Sample hardware when due and write out a partial batch once it is old enough."""
+        if self.sample_interval and time.ticks_diff(time.ticks_ms(), self.last_sample) >= self.sample_interval:
+            self.last_sample = time.ticks_ms()
+            self.sample()
+        if self.buffered and time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def _boot_ranges(self, boot=None):
+        """Return the stored and buffered time ranges as a list of (segment number or None, boot, min_ms, max_ms)."""
+        ranges = []
+        for number in self.segments:
+            for record_boot, (first, last) in self.ranges.get(number, {}).items():
+                if boot is None or record_boot == boot:
+                    ranges.append((number, record_boot, first, last))
+        if self.buffered_range is not None and (boot is None or self.boot == boot):
+            ranges.append((None, self.boot, self.buffered_range[0], self.buffered_range[1]))
+        return ranges
+
+    def _records(self, start, end, boot=None):
+        """Yield (timestamp_ms, channel, boot, kind, value) for stored and buffered records, skipping segments with nothing between start and end."""
+        wanted = set(number for number, _, first, last in self._boot_ranges(boot) if first <= end and last >= start)
+        for number in self.segments:
+            if number in wanted:
+                yield from self._read_segment(number)
+        if None in wanted:
+            for offset in range(0, self.buffered * RECORD_SIZE, RECORD_SIZE):
+                seconds, millis, channel, record_boot, kind, value = struct.unpack_from(RECORD_FORMAT, self.buffer, offset)
+                yield seconds * 1000 + millis, channel, record_boot, kind, value
+
+    def query(self, start=None, end=None, hardware_id=None, kind=None, max_points=100, boot=None):
+        """Return readings between start and end (milliseconds since the epoch, inclusive) downsampled to at most max_points per series.
+
+        Series are keyed "<hardware_id>.<kind>" and hold [time_ms, mean, min, max, count] buckets of equal
+        width, so the reply stays small however many records fall in the range. max_points is lowered
+        so that all series together stay within max_reply_points buckets. Times are kept as
+        integers because single precision floats cannot hold them. With boot set, only records from
+        that boot are returned (see get_stats for the boots stored); by default all boots are.
+        """
+        channel = None
+        if hardware_id is not None:
+            channel = self.channels.get(hardware_id)
+            if channel is None:
+                return {}
+        kind_number = KINDS[kind] if kind is not None else None
+        ranges = self._boot_ranges(boot)
+        if end is None:
+            end = time.time_ns() // 1000000
+            for _, _, _, last in ranges:
+                end = max(end, last)  # Earlier boots may have run with a clock ahead of this one
+        if start is None:
+            start = end
+            for _, _, first, _ in ranges:
+                start = min(start, first)
+        start = int(start)
+        end = int(end)
+        series_count = 0
+        for record_channel, record_kind in self.series:
+            if (channel is None or record_channel == channel) and (kind_number is None or record_kind == kind_number):
+                series_count += 1
+        max_points = max(1, min(max_points, self.max_reply_points // max(1, series_count)))
+        width = max((end - start) // max_points + 1, 1)
+
+        series = {}
+        for timestamp, record_channel, record_boot, record_kind, value in self._records(start, end, boot):
+            if timestamp < start or timestamp > end or (boot is not None and record_boot != boot):
+                continue
+            if (channel is not None and record_channel != channel) or (kind_number is not None and record_kind != kind_number):
+                continue
+            buckets = series.setdefault((record_channel, record_kind), {})
+            index = (timestamp - start) // width
+            bucket = buckets.get(index)
+            if bucket is None:
+                buckets[index] = [value, value, value, 1]  # sum, min, max, count
+            else:
+                bucket[0] += value
+                bucket[1] = min(bucket[1], value)
+                bucket[2] = max(bucket[2], value)
+                bucket[3] += 1
+
+        result = {}
+        for (record_channel, record_kind), buckets in series.items():
+            name = f"{self.channel_ids.get(record_channel, record_channel)}.{KIND_NAMES.get(record_kind, record_kind)}"
+            result[name] = [[start + index * width, bucket[0] / bucket[3], bucket[1], bucket[2], bucket[3]]
+                            for index, bucket in sorted(buckets.items())]
+        return result
+
+    def get_stats(self):
+        """Return storage statistics as a dictionary, including the time range stored for each boot."""
+        stored = 0
+        for number in self.segments:
+            try:
+                stored += os.stat(self._segment_path(number))[6]
+            except OSError:
+                pass
+        boots = {}
+        for _, boot, first, last in self._boot_ranges():
+            self._extend_range(boots, str(boot), first, last)  # String keys, as JSON objects need them
+        return {
+            "segments": len(self.segments),
+            "stored_records": stored // RECORD_SIZE,
+            "stored_bytes": stored,
+            "buffered_records": self.buffered,
+            "records_written": self.records_written,
+            "records_dropped": self.records_dropped,
+            "readings_skipped": self.readings_skipped,
+            "readings_unchanged": self.readings_unchanged,
+            "channels": self.channels,
+            "boot": self.boot,
+            "boots": boots
+        }
+
+    def apply_settings(self, settings):
+        """Apply settings from the given configuration and update the ConfigManager."""
+        if "batch_records" in settings and settings["batch_records"] != self.batch_records:
+            self.flush()  # The buffer is reallocated, so write out what it holds
+            self.batch_records = settings["batch_records"]
+            self.buffer = bytearray(self.batch_records * RECORD_SIZE)
+            self.config_manager.set("telemetry.batch_records", self.batch_records)
+
+        for key in ("segment_size", "max_segments", "flush_interval", "sample_interval", "deadband", "max_reply_points"):
+            if key in settings:
+                setattr(self, key, settings[key])
+                self.config_manager.set(f"telemetry.{key}", settings[key])
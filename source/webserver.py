@@ -1,21 +1,56 @@
 import socket
 import json
+from source.admission_controller import AdmissionController
+from source.logger import Logger
+
+# Prebuilt so it can still be sent when the heap is too fragmented to format a response
+LOW_MEMORY_BODY = '{"status": "error", "message": "Low memory, retry later."}'
+LOW_MEMORY_RESPONSE = (
+    "HTTP/1.1 503 Service Unavailable\r\n"
+    "Content-Type: application/json\r\n"
+    "Content-Length: " + str(len(LOW_MEMORY_BODY)) + "\r\n"
+    "Retry-After: 1\r\n"
+    "Connection: close\r\n"
+    "\r\n" + LOW_MEMORY_BODY
+).encode('utf-8')
+
+# Sent when memory runs out once a command has been dispatched: it may have partly run, so no retry is invited
+COMMAND_MEMORY_ERROR_BODY = '{"status": "error", "message": "Out of memory while running the command, it may have partly run."}'
+COMMAND_MEMORY_ERROR_RESPONSE = (
+    "HTTP/1.1 500 Internal Server Error\r\n"
+    "Content-Type: application/json\r\n"
+    "Content-Length: " + str(len(COMMAND_MEMORY_ERROR_BODY)) + "\r\n"
+    "Connection: close\r\n"
+    "\r\n" + COMMAND_MEMORY_ERROR_BODY
+).encode('utf-8')
+
+# Shortest time (seconds) a client gets to send its request when a scheduled command is about to be due
+MIN_READ_TIMEOUT = 0.05
 
 class Webserver:
     """Class to handle HTTP requests over Wi-Fi."""
 
-    def __init__(self, network_manager, control_interface, config_manager):
+    def __init__(self, network_manager, control_interface, config_manager, memory_manager=None, logger=None, scheduler=None):
         self.network_manager = network_manager
         self.control_interface = control_interface
         self.config_manager = config_manager
+        self.memory_manager = memory_manager  # Optional, rejects non-critical requests when the heap is low
+        self.logger = logger or Logger(config_manager)  # Request path logging, flushed between requests
+        self.scheduler = scheduler  # Optional command timeline, run on time between requests
         
         # Load webserver config from ConfigManager, fallback to default values
         self.webserver_config = self.config_manager.get("webserver", {})
         self.port = self.webserver_config.get("port", 8080)
         self.verbose = self.webserver_config.get("verbose", False)
+        self.request_timeout = self.webserver_config.get("request_timeout", 5)  # Seconds to wait for a client to send its request
+        self.idle_timeout = self.webserver_config.get("idle_timeout", 0.1)  # Seconds to wait for a connection before running idle tasks
+        self.idle_tasks = []  # Callables run between requests (e.g. telemetry sampling)
         self.ip = None
         self.server_socket = None
 
+        # Queues requests by command priority and rate limits clients
+        self.admission_controller = AdmissionController(config_manager, control_interface)
+
     def start(self):
         """Start the webserver."""
         # Ensure Wi-Fi is connected
@@ -35,25 +70,108 @@ class Webserver:
             "verbose": self.verbose
         })
 
-        # Set up server socket
+        # Set up server socket, with a backlog matching the request queue
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind((self.ip, self.port))
-        self.server_socket.listen(1)
+        self.server_socket.listen(self.admission_controller.queue_depth)
         print(f"Webserver is listening on {self.ip}:{self.port}")
 
         while True:
-            conn, addr = self.server_socket.accept()
-            print(f"Connection from {addr}")
+            # Scheduled commands go first, then queue everything that has arrived and run the highest priority command
+            if self.scheduler:
+                self.scheduler.run_pending()
+            self._accept_requests()
+            request = self.admission_controller.next_request()
+            if request:
+                if self.scheduler:
+                    self.scheduler.run_pending()
+                self._dispatch(request)
+            # Between requests is the natural idle point to reclaim the heap and write out logs
+            if self.memory_manager:
+                self.memory_manager.idle()
+            self.logger.flush(self.logger.flush_batch)
+            for task in self.idle_tasks:
+                # A failing task (e.g. a full filesystem) must not take the server down
+                try:
+                    task()
+                except Exception as e:
+                    self.logger.error("Error in idle task %s: %s", task, e)
+
+    def add_idle_task(self, task):
+        """Register a callable to run between requests and whenever the server is idle."""
+        self.idle_tasks.append(task)
+
+    def _time_until_scheduled(self):
+        """Return the seconds until the next scheduled command is due, or None if nothing is scheduled."""
+        if self.scheduler:
+            next_in_ms = self.scheduler.time_until_next()
+            if next_in_ms is not None:
+                return next_in_ms / 1000
+        return None
+
+    def _accept_requests(self):
+        """Accept, read and queue pending connections, waiting for the first if nothing is queued.
+
+        The wait ends after idle_timeout, or earlier when the next scheduled command is due, and
+        no further connections are accepted once it is due.
+        """
+        timeout = self.idle_timeout
+        due_in = self._time_until_scheduled()
+        if due_in is not None:
+            timeout = min(timeout, due_in)
+        if self.admission_controller.pending() or timeout <= 0:
+            self.server_socket.setblocking(False)
+        else:
+            self.server_socket.settimeout(timeout)
+        while True:
             try:
-                self._handle_request(conn)
-            except Exception as e:
-                print(f"Error handling request: {str(e)}")
-            finally:
-                conn.close()
-
-    def _handle_request(self, conn):
-        """Handle an incoming HTTP request."""
+                conn, addr = self.server_socket.accept()
+            except OSError:
+                break  # No more pending connections, or the idle timeout passed
+            self._queue_request(conn, addr)
+            self.server_socket.setblocking(False)
+            due_in = self._time_until_scheduled()
+            if due_in is not None and due_in <= 0:
+                break  # Run the scheduled command before reading more requests
+
+    def _queue_request(self, conn, addr):
+        """Read a request and hand it to the admission controller, rejecting it if it is not admitted."""
+        self.logger.debug("Connection from %s", addr)
+        # A slow client must not hold up a scheduled command for the whole request timeout
+        read_timeout = self.request_timeout
+        due_in = self._time_until_scheduled()
+        if due_in is not None:
+            read_timeout = min(read_timeout, max(due_in, MIN_READ_TIMEOUT))
+        conn.settimeout(read_timeout)
+        try:
+            request = self._read_request(conn)
+        except MemoryError:
+            self._send_low_memory(conn)
+            conn.close()
+            return
+        except Exception as e:
+            self.logger.error("Error reading request from %s: %s", addr, e)
+            self._reject(conn, "400 Bad Request", str(e))
+            return
+
+        if request is None:
+            conn.close()
+            return
+        command, args = request
+
+        if not self.admission_controller.allow_client(addr[0], command):
+            self.logger.warning("Rate limit exceeded by %s, rejected command: %s", addr[0], command)
+            self._reject(conn, "429 Too Many Requests", "Rate limit exceeded, retry later.")
+            return
+
+        shed = self.admission_controller.submit(command, (conn, command, args))
+        if shed:
+            self.logger.warning("Request queue full, shed command: %s", shed[1])
+            self._reject(shed[0], "503 Service Unavailable", "Request queue full, retry later.")
+
+    def _read_request(self, conn):
+        """Read an HTTP request and parse its JSON body. Returns (command, args), or None if no data was received."""
         request_data = []
         content_length = 0
         
@@ -76,63 +194,102 @@ class Webserver:
                 break
         
         data = ''.join(request_data)
-        if self.verbose:
-            print("\n--- Incoming Request ---")
-            print(data)  # Log the full raw HTTP request
-        
         if not data:
-            print("No data received.")
-            return
+            self.logger.debug("No data received.")
+            return None
+
+        headers, body = data.split("\r\n\r\n", 1)
+        if self.verbose:
+            self.logger.info("Request headers:\n%s", headers)  # Log the HTTP headers
+            self.logger.info("Request body: %s", body)  # Log the raw body
+
+        command_data = json.loads(body)
 
+        return command_data.get("command"), command_data.get("args", [])
+
+    def _dispatch(self, request):
+        """Run a queued request and send its response."""
+        conn, command, args = request
         try:
-            headers, body = data.split("\r\n\r\n", 1)
-            if self.verbose:
-                print("\n--- Parsed Headers ---")
-                print(headers)  # Log the HTTP headers
-                print("\n--- Raw Body ---")
-                print(body)  # Log the raw body
-
-            command_data = json.loads(body)
-            if self.verbose:
-                print("\n--- Parsed JSON Body ---")
-                print(json.dumps(command_data))
-            
-            command = command_data.get("command")
-            args = command_data.get("args", [])
-            print(f"\nExecuting Command: {command}")
-            print(f"With Arguments: {args}")
+            self._execute(conn, command, args)
+        except MemoryError:
+            self._send_low_memory(conn, dispatched=True)  # The command ran, only its response failed
+        except Exception as e:
+            self.logger.error("Error handling request: %s", e)
+        finally:
+            conn.close()
 
+    def _execute(self, conn, command, args):
+        """Execute a command and send the HTTP response."""
+        dispatched = False
+        try:
+            if self.memory_manager and not self.memory_manager.admit(command):
+                self.logger.warning("Low memory, rejected command: %s", command)
+                self._send_low_memory(conn, collect=False)  # admit() has just collected
+                return
+
+            self.logger.info("Executing command %s", command)
+            self.logger.debug("Arguments of %s: %s", command, args)  # Only converted to text at DEBUG
+
+            dispatched = True
             response_data = self.control_interface.handle_command(command, *args)
             response = {
                 "status": "success",
                 "response": response_data
             }
             http_status = "200 OK"
+        except MemoryError:
+            # Formatting an error response could fail again, so send the prebuilt one
+            self._send_low_memory(conn, dispatched=dispatched)
+            return
         except Exception as e:
-            print("\n--- Exception During Processing ---")
-            print(f"Error: {e}")
+            self.logger.error("Error executing command %s: %s", command, e)
             response = {"status": "error", "message": str(e)}
             http_status = "500 Internal Server Error"
 
+        self._send_response(conn, http_status, response)
+
+    def _send_response(self, conn, http_status, response, retry_after=None):
+        """Send a JSON response with the given HTTP status."""
         response_json = json.dumps(response)
-        if self.verbose:
-            print("\n--- Response Data ---")
-            print(json.dumps(response))  # Pretty-print the response JSON
 
+        retry_header = f"Retry-After: {retry_after}\r\n" if retry_after is not None else ""
         http_response = (
             f"HTTP/1.1 {http_status}\r\n"
             "Content-Type: application/json\r\n"
             f"Content-Length: {len(response_json)}\r\n"
+            f"{retry_header}"
             "Connection: close\r\n"
             "\r\n"
             f"{response_json}"
         )
         if self.verbose:
-            print("\n--- HTTP Response ---")
-            print(http_response)  # Log the full HTTP response
+            self.logger.info("Response: %s %s", http_status, response_json)  # Log the status and response JSON
 
         conn.sendall(http_response.encode('utf-8'))
 
+    def _reject(self, conn, http_status, message):
+        """Send an error response asking the client to retry, then close the connection."""
+        try:
+            self._send_response(conn, http_status, {"status": "error", "message": message}, retry_after=1)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def _send_low_memory(self, conn, collect=True, dispatched=False):
+        """Send a prebuilt low memory response, first reclaiming what heap we can unless collect is False.
+
+        Work refused before dispatch gets a 503 asking the client to retry. Once the command has
+        been dispatched it may have partly run, so a 500 without Retry-After is sent instead.
+        """
+        if collect and self.memory_manager:
+            self.memory_manager.collect()
+        try:
+            conn.sendall(COMMAND_MEMORY_ERROR_RESPONSE if dispatched else LOW_MEMORY_RESPONSE)
+        except OSError:
+            pass
+
     def apply_settings(self, settings):
         """Apply settings from the given configuration and update the ConfigManager."""
         if "ip" in settings: